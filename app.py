@@ -1,6 +1,27 @@
+import hashlib
+import time
 import streamlit as st
 from pathlib import Path
-from scripts.rule_based_validation import validate_dataset
+from scripts.job_queue import JobRunner
+
+RAW_DIR = Path("data/raw")
+JOBS_DIR = Path("data/jobs")
+
+
+@st.cache_resource
+def job_runner():
+    # One runner per server: validations run in its worker processes, so sessions never block each other
+    return JobRunner(JOBS_DIR)
+
+
+def save_upload(file_name, file_digest, file_bytes):
+    # Stored by content, so another session's upload never replaces a file still being validated
+    temp_file = RAW_DIR / file_digest[:16] / file_name
+    if not temp_file.exists():
+        temp_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file.write_bytes(file_bytes)
+    return temp_file
+
 
 # Page Config
 st.set_page_config(page_title="Data Validation Suite", layout="wide")
@@ -57,26 +78,51 @@ st.markdown(
 
 # Sidebar
 st.sidebar.title("Navigation")
-st.sidebar.markdown("Upload CSV → Validate → Download styled reports.")
+st.sidebar.markdown("Upload CSV/Parquet/Feather → Validate → Download styled reports.")
 
 # Main Title
 st.markdown("<div class='main-title'>Data Validation Dashboard</div>", unsafe_allow_html=True)
 
 # File Uploader
-uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
+uploaded_file = st.file_uploader("Upload your data file", type=["csv", "parquet", "feather", "arrow"])
 rules_file = Path("data/validation_rules.json")
+cache_dir = Path("data/cache")
 
 if uploaded_file:
-    # Save uploaded file
-    temp_file = Path("data/raw") / uploaded_file.name
-    temp_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(temp_file, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    # Run validation
-    bad_rows, report_file, issues_summary = validate_dataset(
-        temp_file, rules_file if rules_file.exists() else None
-    )
+    # Widget interactions rerun the script; only validate when the upload or rules change
+    rules_digest = hashlib.sha256(rules_file.read_bytes()).hexdigest() if rules_file.exists() else ""
+    validation_key = (uploaded_file.file_id, rules_digest)
+    if st.session_state.get("validation_key") != validation_key:
+        file_bytes = uploaded_file.getvalue()
+        temp_file = save_upload(uploaded_file.name, hashlib.sha256(file_bytes).hexdigest(), file_bytes)
+        # Repeated uploads of the same file and rules are answered from the result cache
+        st.session_state.job_id = job_runner().submit(
+            temp_file, rules_path=rules_file if rules_digest else None, cache=cache_dir
+        )
+        st.session_state.validation_key = validation_key
+        st.session_state.validation = None
+        st.session_state.issues_csv = None
+    if st.session_state.validation is None:
+        try:
+            job = job_runner().status(st.session_state.job_id)
+        except KeyError:
+            # Expired before this session fetched it; validate again
+            st.session_state.validation_key = None
+            st.rerun()
+        if job["state"] == "failed":
+            st.error(f"Validation failed: {job['error']}")
+            # Submit again on the next interaction
+            st.session_state.validation_key = None
+            st.stop()
+        if job["state"] != "done":
+            # Poll the job table and rerun; the validation itself runs in a worker process
+            rows_read = job["rows_read"]
+            st.progress(min(rows_read / max(job["total_rows"] or 1, 1), 1.0),
+                        text=f"Validating ({job['stage'] or job['state']}): {rows_read:,} rows read")
+            time.sleep(1)
+            st.rerun()
+        st.session_state.validation = job_runner().result(st.session_state.job_id)
+    issues, report_file, issues_summary = st.session_state.validation
 
     # Summary
     st.markdown("### Validation Summary")
@@ -95,26 +141,36 @@ if uploaded_file:
                 )
     else:
         st.success("No issues found! 🎉")
+    bytes_saved = issues.metadata.get("category_bytes_saved", 0)
+    if bytes_saved:
+        st.caption(f"Loaded {len(issues.metadata['categorical_columns'])} text columns as categories, "
+                   f"saving {bytes_saved / 2**20:.1f} MB")
+
+    stage_timings = issues.metadata.get("stage_timings")
+    if stage_timings:
+        with st.expander("Stage timings"):
+            st.dataframe(stage_timings, hide_index=True)
 
     # Tabs
     tab1, tab2 = st.tabs(["Preview Issues", "Download Reports"])
 
     with tab1:
-        if bad_rows.empty:
+        if issues.empty:
             st.info("No issues to preview.")
         else:
-            for category, df_cat in bad_rows.groupby("issue"):
+            for category, df_cat in sorted(issues.groups(), key=lambda item: item[0]):
                 with st.expander(f"{category} ({len(df_cat)} rows)"):
-                    st.dataframe(df_cat.drop(columns=["issue"]).head(5))
+                    st.dataframe(df_cat.head(5))
 
     with tab2:
         st.markdown("#### Download Reports")
-        if not bad_rows.empty:
+        if not issues.empty:
             file_stem = Path(uploaded_file.name).stem.replace(" ", "_")
-            csv_data = bad_rows.drop(columns=["issue"]).to_csv(index=False).encode()
+            if st.session_state.issues_csv is None:
+                st.session_state.issues_csv = issues.to_frame().drop(columns=["issue"]).to_csv(index=False).encode()
             st.download_button(
                 label="Download Issues CSV",
-                data=csv_data,
+                data=st.session_state.issues_csv,
                 file_name=f"{file_stem}_issues.csv",
                 mime="text/csv"
             )
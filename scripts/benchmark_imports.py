@@ -0,0 +1,39 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Each scenario runs in a fresh interpreter, as a Streamlit cold start or CLI run would
+SCENARIOS = {
+    "validator": "import scripts.rule_based_validation",
+    "validator + sklearn (eager import)": "import scripts.rule_based_validation, sklearn.ensemble, sklearn.neighbors",
+    "validator + sklearn loaded after": "import scripts.rule_based_validation, sys; "
+                                        "assert 'sklearn' not in sys.modules; import sklearn.ensemble",
+}
+
+
+def time_import(statement, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=BASE_DIR, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time interpreter start plus validator import.")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, statement in SCENARIOS.items():
+        median, best = time_import(statement, args.repeats)
+        print(f"{name:>36}: median {median:6.3f}s  best {best:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from scripts.ingest import ENGINES, read_table
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / "data" / "raw" / "homelessness_shelter_data.csv"
+
+
+def write_scaled_csv(source, rows, out_path):
+    # Repeats the source body until the file has `rows` data rows
+    header, *body = Path(source).read_text().splitlines(keepends=True)
+    block = "".join(body)
+    with open(out_path, "w") as f:
+        f.write(header)
+        for _ in range(rows // len(body)):
+            f.write(block)
+        f.write("".join(body[:rows % len(body)]))
+
+
+def _time_engine(path, engine):
+    start = time.perf_counter()
+    df = read_table(path, engine=engine)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed, peak_mb, len(df), df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV ingestion engines on a scaled-up file.")
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "scaled.csv"
+        write_scaled_csv(args.source, args.rows, path)
+        print(f"{path.stat().st_size / 2**20:.0f} MB, {args.rows:,} rows")
+        for engine in args.engines:
+            # A fresh process per engine so peak RSS is not shared between runs
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, peak_mb, n, frame_mb = pool.submit(_time_engine, path, engine).result()
+            print(f"{engine:>8}: {elapsed:7.2f}s  {n / elapsed:12,.0f} rows/s  "
+                  f"peak RSS {peak_mb:7.0f} MB  frame {frame_mb:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import hashlib
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from scripts.ingest import read_chunks, text_columns
+
+
+def lookup(index, values):
+    # Position of each value in a unique pd.Index, -1 when absent; categoricals hash each category once
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        positions = np.append(index.get_indexer(values.cat.categories), -1)
+        return positions[values.cat.codes.to_numpy()]
+    return index.get_indexer(values)
+
+
+class CategoryProfile:
+    """Allowed values per text column, each held as a unique pd.Index built once.
+
+    Profiles are learned from a reference file (``learn_categories``), which
+    also records how often each value occurred there. ``evaluate``
+    flags non-null values missing from a column's index as invalid and, where
+    reference counts exist, values below ``rare_share`` of the reference as
+    rare. Each distinct value is hashed once per frame (once per category for
+    categorical columns), so the cost is linear in rows however many values
+    are allowed. Nulls are left to the missing-values check.
+    """
+
+    def __init__(self, allowed, rare=None):
+        self.allowed = {col: pd.Index(values).dropna().unique() for col, values in allowed.items()}
+        # Per column, one flag per allowed value plus a trailing False picked by position -1
+        self.rare = dict(rare or {})
+        self.digest = hashlib.sha256(pickle.dumps(
+            (sorted((col, list(index)) for col, index in self.allowed.items()),
+             sorted((col, flags.tolist()) for col, flags in self.rare.items())))).hexdigest()
+
+    @property
+    def columns(self):
+        return list(self.allowed)
+
+    def __bool__(self):
+        return bool(self.allowed)
+
+    def evaluate(self, df):
+        # Yields (column, invalid mask, rare mask or None) for the profiled columns present in df
+        for col, index in self.allowed.items():
+            if col not in df.columns:
+                continue
+            positions = lookup(index, df[col])
+            invalid = (positions == -1) & df[col].notna().to_numpy()
+            rare = self.rare[col][positions] if col in self.rare else None
+            yield col, invalid, rare
+
+
+def learn_categories(reference_path, engine="pandas", chunksize=None, max_categories=100_000,
+                     rare_share=0.001):
+    """Profile the text columns of a reference file.
+
+    Every value seen in the reference is allowed; values making up less than
+    ``rare_share`` of a column's non-null cells are also marked rare. Columns
+    with more than ``max_categories`` distinct values are free text and are
+    not profiled.
+    """
+    counts = {}
+    for chunk in read_chunks(reference_path, chunksize, engine, category_ratio=0.5):
+        for col in text_columns(chunk):
+            if col in counts and counts[col] is None:
+                continue
+            chunk_counts = chunk[col].value_counts(sort=False)
+            # Plain object labels, so counts from chunks with different categories or dtypes align
+            chunk_counts = pd.Series(chunk_counts.to_numpy(),
+                                     index=pd.Index(chunk_counts.index.tolist(), dtype=object))
+            chunk_counts = chunk_counts[chunk_counts > 0]
+            total = chunk_counts if col not in counts else counts[col].add(chunk_counts, fill_value=0)
+            counts[col] = total if len(total) <= max_categories else None
+    allowed, rare = {}, {}
+    for col, col_counts in counts.items():
+        if col_counts is None:
+            continue
+        col_counts = col_counts[col_counts.index.notna()]
+        allowed[col] = col_counts.index
+        shares = col_counts.to_numpy(dtype=float) / max(col_counts.sum(), 1)
+        rare[col] = np.append(shares < rare_share, False)
+    return CategoryProfile(allowed, rare)
@@ -0,0 +1,184 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from scripts.ingest import read_chunks
+
+
+# Every missing cell hashes to this, whatever dtype its column was read as
+MISSING_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def cell_hashes(values):
+    # 64-bit hash per cell by value, so the same value matches across chunks, files and engines
+    # whose readers gave the column different dtypes: numbers hash as float64 (so 1 and 1.0
+    # match), booleans and text as Python objects, categoricals as their values
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        # + 0.0 turns -0.0 into 0.0
+        values = pd.Series(values.to_numpy(dtype=float, na_value=np.nan) + 0.0)
+    elif not (isinstance(values.dtype, pd.CategoricalDtype) or values.dtype.kind in "mMO"):
+        values = values.astype(object)
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    hashes[values.isna().to_numpy()] = MISSING_HASH
+    return hashes
+
+
+def row_fingerprints(df, key_columns=None):
+    # 64-bit hash per row of the key columns (all columns by default), ignoring the index
+    frame = df if key_columns is None else df[list(key_columns)]
+    # Column hashes are combined in order as hash_pandas_object does, without hashing them again
+    fingerprints = np.full(len(frame), 0x345678, dtype=np.uint64)
+    mult = np.uint64(1000003)
+    for j in range(frame.shape[1]):
+        fingerprints ^= cell_hashes(frame.iloc[:, j])
+        fingerprints *= mult
+        mult += np.uint64(82520 + 2 * (frame.shape[1] - j))
+    return fingerprints + np.uint64(97531)
+
+
+def first_occurrences(fingerprints):
+    # Same semantics as DataFrame.duplicated(): every repeat after the first is flagged
+    repeated = np.ones(len(fingerprints), dtype=bool)
+    repeated[np.unique(fingerprints, return_index=True)[1]] = False
+    return repeated
+
+
+class DuplicateDetector:
+    """Exact duplicate detection over any number of frames with 8 bytes per distinct row.
+
+    Each row is reduced to a 64-bit fingerprint and the fingerprints seen so
+    far are kept in one sorted array, so duplicates are found across chunks
+    of a file and across files. A row is flagged when the same fingerprint
+    appeared earlier, either earlier in the same frame or in a previous one.
+    The chance of any false match among n rows is about n**2 / 2**65 (about
+    3 in 10,000 at 100 million rows). Cells hash by value (see cell_hashes),
+    so a column read as int in one chunk and as float, Arrow or nullable
+    types in another still matches. Numbers read as text, in a column whose
+    frame also holds non-numeric values, do not match numbers elsewhere.
+    """
+
+    needs_recheck = False
+
+    def __init__(self, key_columns=None):
+        self.key_columns = list(key_columns) if key_columns else None
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def update(self, df):
+        return self.update_fingerprints(row_fingerprints(df, self.key_columns))
+
+    def update_fingerprints(self, fingerprints):
+        duplicated = first_occurrences(fingerprints)
+        if len(self.seen):
+            pos = np.minimum(np.searchsorted(self.seen, fingerprints), len(self.seen) - 1)
+            duplicated |= self.seen[pos] == fingerprints
+        new = np.unique(fingerprints[~duplicated])
+        if len(new):
+            # Two sorted runs, which the stable (timsort) path merges in linear time
+            self.seen = np.sort(np.concatenate([self.seen, new]), kind='stable')
+        return duplicated
+
+    def __len__(self):
+        return len(self.seen)
+
+    @property
+    def nbytes(self):
+        return self.seen.nbytes
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over 64-bit fingerprints, using double hashing for the k probes."""
+
+    def __init__(self, capacity, fpr=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(math.ceil(-capacity * math.log(fpr) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _probes(self, fingerprints):
+        low = fingerprints & np.uint64(0xFFFFFFFF)
+        high = fingerprints >> np.uint64(32)
+        steps = np.arange(self.hashes, dtype=np.uint64)[:, None]
+        return (low + steps * high) % np.uint64(self.size)
+
+    def contains(self, fingerprints):
+        probes = self._probes(fingerprints)
+        hits = (self.bits[probes >> np.uint64(3)] >> (probes & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=0)
+
+    def add(self, fingerprints):
+        probes = self._probes(fingerprints).ravel()
+        np.bitwise_or.at(self.bits, probes >> np.uint64(3),
+                         (np.uint8(1) << (probes & np.uint64(7)).astype(np.uint8)))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+class ApproximateDuplicateDetector:
+    """Two-pass duplicate detection for files too large for an exact fingerprint set.
+
+    The first pass (``update``) only inserts fingerprints into a Bloom filter
+    sized for ``capacity`` rows at false-positive rate ``fpr`` (about 1.2 bytes
+    per row at 1%) and keeps the fingerprints that were probably seen before.
+    Every true duplicate is among those candidates. The second pass
+    (``recheck``) runs an exact DuplicateDetector over only the rows whose
+    fingerprint is a candidate, so the reported duplicates are exact. When
+    more rows than ``capacity`` arrive, only the candidate set grows.
+
+    One detector covers one file: once ``recheck`` has started, rows that
+    become candidates later would have to be matched against rows already
+    rechecked without them, so ``update`` refuses more rows. Use a
+    DuplicateDetector to find duplicates across files.
+    """
+
+    needs_recheck = True
+
+    def __init__(self, capacity, fpr=0.01, key_columns=None):
+        self.key_columns = list(key_columns) if key_columns else None
+        self.bloom = BloomFilter(capacity, fpr)
+        self._candidate_parts = []
+        self.candidates = None
+        self._exact = DuplicateDetector()
+
+    def update(self, df):
+        if self.candidates is not None:
+            raise RuntimeError("This ApproximateDuplicateDetector has already been rechecked and cannot take "
+                               "more rows; use a DuplicateDetector to find duplicates across files")
+        fingerprints = row_fingerprints(df, self.key_columns)
+        maybe_seen = first_occurrences(fingerprints)
+        maybe_seen[~maybe_seen] = self.bloom.contains(fingerprints[~maybe_seen])
+        self.bloom.add(fingerprints)
+        self._candidate_parts.append(np.unique(fingerprints[maybe_seen]))
+        return None
+
+    def recheck(self, df):
+        if self.candidates is None:
+            self.candidates = np.unique(np.concatenate(self._candidate_parts or [np.empty(0, np.uint64)]))
+            self._candidate_parts = []
+        fingerprints = row_fingerprints(df, self.key_columns)
+        duplicated = np.zeros(len(fingerprints), dtype=bool)
+        if len(self.candidates):
+            pos = np.minimum(np.searchsorted(self.candidates, fingerprints), len(self.candidates) - 1)
+            candidate = self.candidates[pos] == fingerprints
+            duplicated[candidate] = self._exact.update_fingerprints(fingerprints[candidate])
+        return duplicated
+
+    @property
+    def nbytes(self):
+        return self.bloom.nbytes + sum(p.nbytes for p in self._candidate_parts) + self._exact.nbytes
+
+
+def duplicates_across_files(paths, key_columns=None, chunksize=None, engine="pandas"):
+    # Row positions in each file whose row (or key) already appeared earlier in it or in a previous file
+    detector = DuplicateDetector(key_columns)
+    found = {}
+    for path in paths:
+        positions = []
+        offset = 0
+        for chunk in read_chunks(path, chunksize, engine, key_columns):
+            positions.append(np.flatnonzero(detector.update(chunk)) + offset)
+            offset += len(chunk)
+        found[path] = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+    return found
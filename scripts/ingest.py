@@ -0,0 +1,269 @@
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
+
+try:
+    from scripts.instrumentation import profile_stage
+except ImportError:  # imported from inside scripts/, as profile_data.py does
+    from instrumentation import profile_stage
+
+NA_VALUES = ["", "NA", "N/A", "-"]
+
+# pandas' default NA tokens plus NA_VALUES, so both engines null the same cells
+ARROW_NULL_VALUES = sorted({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null", *NA_VALUES,
+})
+
+ENGINES = ("pandas", "pyarrow")
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_IPC_SUFFIXES = {".feather", ".arrow", ".ipc"}
+
+
+def numeric_columns(df):
+    # Covers NumPy, nullable and Arrow-backed numeric dtypes; booleans are not numeric checks
+    return [col for col in df.columns if is_numeric_dtype(df[col]) and not is_bool_dtype(df[col])]
+
+
+def text_columns(df):
+    return [col for col in df.columns
+            if is_object_dtype(df[col]) or is_string_dtype(df[col]) or isinstance(df[col].dtype, pd.CategoricalDtype)]
+
+
+def categorize(df, max_ratio=0.5):
+    # Converts text columns with at most max_ratio distinct values per row to category dtype,
+    # recording the converted columns and bytes saved in df.attrs
+    converted, saved = [], 0
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or not (is_object_dtype(series) or is_string_dtype(series)):
+            continue
+        codes, uniques = pd.factorize(series)
+        # All-null columns are left alone so they keep the dtype other chunks will have
+        if not 0 < len(uniques) <= max_ratio * len(series):
+            continue
+        before = series.memory_usage(deep=True, index=False)
+        df[col] = pd.Categorical.from_codes(codes, pd.Index(uniques))
+        saved += before - df[col].memory_usage(deep=True, index=False)
+        converted.append(col)
+    df.attrs["categorical_columns"] = converted
+    df.attrs["category_bytes_saved"] = int(saved)
+    return df
+
+
+def _blank_to_null(table):
+    # Whitespace-only strings become null on the Arrow arrays, replacing the per-cell regex pass
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for col in table.columns:
+        if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            col = pc.if_else(pc.utf8_is_space(col), pa.scalar(None, col.type), col)
+        columns.append(col)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+def _dictionary_encode(table, max_ratio):
+    # Arrow-side counterpart of categorize(): low-cardinality strings become dictionary arrays
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns, converted, saved = [], [], 0
+    for name, col in zip(table.column_names, table.columns):
+        if ((pa.types.is_string(col.type) or pa.types.is_large_string(col.type))
+                and 0 < pc.count_distinct(col).as_py() <= max_ratio * len(col)):
+            encoded = col.dictionary_encode()
+            saved += col.nbytes - encoded.nbytes
+            converted.append(name)
+            col = encoded
+        columns.append(col)
+    return pa.Table.from_arrays(columns, names=table.column_names), converted, saved
+
+
+def _arrow_types(arrow_type):
+    import pyarrow as pa
+    # Dictionary arrays convert to pandas Categorical; everything else stays Arrow-backed
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def _arrow_to_pandas(table, offset=0, engine="pyarrow", category_ratio=None):
+    with profile_stage("whitespace replace", table.num_rows):
+        table = _blank_to_null(table)
+    converted, saved = [], 0
+    if category_ratio:
+        with profile_stage("categorize", table.num_rows):
+            table, converted, saved = _dictionary_encode(table, category_ratio)
+    df = table.to_pandas(types_mapper=_arrow_types) if engine == "pyarrow" else table.to_pandas()
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    if category_ratio:
+        df.attrs["categorical_columns"] = converted
+        df.attrs["category_bytes_saved"] = int(saved)
+    return df
+
+
+def _rebatch(batches, chunksize, engine, category_ratio=None):
+    # Regroups record batches of any size into frames of exactly chunksize rows
+    import pyarrow as pa
+
+    pending, pending_rows, offset = [], 0, 0
+    for batch in batches:
+        if pending and batch.schema != pending[0].schema:
+            # A reopened CSV reader (see _arrow_csv_batches) may have typed a column more generally,
+            # e.g. as text; rows still pending take its types, or become a shorter frame if they cannot
+            table = pa.Table.from_batches(pending)
+            try:
+                pending = table.cast(batch.schema).to_batches()
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                yield _arrow_to_pandas(table, offset, engine, category_ratio)
+                offset += pending_rows
+                pending, pending_rows = [], 0
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield _arrow_to_pandas(table.slice(0, chunksize), offset, engine, category_ratio)
+            offset += chunksize
+            rest = table.slice(chunksize)
+            pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        yield _arrow_to_pandas(pa.Table.from_batches(pending), offset, engine, category_ratio)
+
+
+def _read_arrow_csv(file_path, chunksize=None, columns=None, category_ratio=None):
+    from pyarrow import csv as pa_csv
+
+    read_options = pa_csv.ReadOptions(use_threads=True)
+    convert_options = pa_csv.ConvertOptions(null_values=ARROW_NULL_VALUES, strings_can_be_null=True,
+                                            include_columns=columns)
+    if not chunksize:
+        yield _arrow_to_pandas(pa_csv.read_csv(file_path, read_options=read_options,
+                                               convert_options=convert_options), category_ratio=category_ratio)
+        return
+    yield from _rebatch(_arrow_csv_batches(file_path, convert_options), chunksize, "pyarrow", category_ratio)
+
+
+def _arrow_csv_batches(file_path, convert_options):
+    # The streaming reader fixes column types from its first block, so a later value that does not fit
+    # them (e.g. text in a column of ints) fails the read; the reader is then reopened at the failing
+    # block, which infers the types again
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    rows = 0
+    while True:
+        read_options = pa_csv.ReadOptions(use_threads=True, skip_rows_after_names=rows)
+        reader = pa_csv.open_csv(file_path, read_options=read_options, convert_options=convert_options)
+        start = rows
+        try:
+            for batch in reader:
+                rows += batch.num_rows
+                yield batch
+            return
+        except pa.ArrowInvalid:
+            if rows == start:
+                # The first block failed against its own types, so the file itself is malformed
+                raise
+
+
+def _read_parquet(file_path, chunksize=None, columns=None, engine="pyarrow", category_ratio=None):
+    import pyarrow.parquet as pq
+
+    if not chunksize:
+        yield _arrow_to_pandas(pq.read_table(file_path, columns=columns), engine=engine,
+                               category_ratio=category_ratio)
+        return
+    parquet_file = pq.ParquetFile(file_path)
+    yield from _rebatch(parquet_file.iter_batches(batch_size=chunksize, columns=columns), chunksize, engine,
+                        category_ratio)
+
+
+def _read_arrow_ipc(file_path, chunksize=None, columns=None, engine="pyarrow", category_ratio=None):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if not chunksize:
+        yield _arrow_to_pandas(feather.read_table(file_path, columns=columns, memory_map=True), engine=engine,
+                               category_ratio=category_ratio)
+        return
+    # Memory-mapped, so batches of unselected columns are never read
+    reader = pa.ipc.open_file(pa.memory_map(str(file_path)))
+    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    if columns is not None:
+        batches = (batch.select(columns) for batch in batches)
+    yield from _rebatch(batches, chunksize, engine, category_ratio)
+
+
+def file_format(file_path):
+    suffix = Path(file_path).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in ARROW_IPC_SUFFIXES:
+        return "arrow"
+    return "csv"
+
+
+def available_columns(file_path):
+    fmt = file_format(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(file_path).names)
+    if fmt == "arrow":
+        import pyarrow as pa
+        return list(pa.ipc.open_file(pa.memory_map(str(file_path))).schema.names)
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+
+def estimate_rows(file_path, sample_bytes=1 << 20):
+    # Exact for Parquet/Arrow from metadata; CSV extrapolates the line count of the first MB
+    fmt = file_format(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).metadata.num_rows
+    if fmt == "arrow":
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(str(file_path)))
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    size = Path(file_path).stat().st_size
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_bytes)
+    lines = max(sample.count(b"\n"), 1)
+    return max(int(lines * size / max(len(sample), 1)) - 1, 1)
+
+
+def project_columns(file_path, wanted):
+    # Columns of the file that are in `wanted`, in file order; None reads everything
+    if wanted is None:
+        return None
+    wanted = set(wanted)
+    return [col for col in available_columns(file_path) if col in wanted]
+
+
+def read_chunks(file_path, chunksize=None, engine="pandas", columns=None, category_ratio=None):
+    # Yields the whole file as one frame, or fixed-size frames when chunksize is set.
+    # `columns` projects the read so only those columns are loaded from disk, and
+    # `category_ratio` converts low-cardinality text columns to category while reading.
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    fmt = file_format(file_path)
+    if fmt == "parquet":
+        yield from _read_parquet(file_path, chunksize, columns, engine, category_ratio)
+    elif fmt == "arrow":
+        yield from _read_arrow_ipc(file_path, chunksize, columns, engine, category_ratio)
+    elif engine == "pyarrow":
+        yield from _read_arrow_csv(file_path, chunksize, columns, category_ratio)
+    else:
+        frames = (pd.read_csv(file_path, na_values=NA_VALUES, chunksize=chunksize, usecols=columns) if chunksize
+                  else [pd.read_csv(file_path, na_values=NA_VALUES, usecols=columns)])
+        for df in frames:
+            with profile_stage("whitespace replace", len(df)):
+                df = df.replace(r'^\s*$', pd.NA, regex=True)
+            if category_ratio:
+                with profile_stage("categorize", len(df)):
+                    df = categorize(df, category_ratio)
+            yield df
+
+
+def read_table(file_path, engine="pandas", columns=None, category_ratio=None):
+    return next(read_chunks(file_path, engine=engine, columns=columns, category_ratio=category_ratio))
@@ -0,0 +1,120 @@
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_active = ContextVar("stage_profiler", default=None)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageProfiler:
+    """Wall time, CPU time, memory and rows for each named stage of a validation run.
+
+    Stages may nest (the ML fit runs inside the ML stage, whitespace
+    replacement inside ingestion); each stage is charged only for its own
+    time, not its children's, so the rows of ``records`` add up to the run.
+    A stage that runs once per chunk accumulates over all its calls.
+
+    Memory is reported as the process peak RSS after the stage and how much
+    the stage raised it. With ``trace_memory=True`` the peak of
+    tracemalloc-traced allocations during the stage is recorded too; this
+    is more precise per stage but slows allocation-heavy code.
+
+    ``progress``, if given, is called as ``progress(stage, rows_read)`` each
+    time a stage starts, where ``rows_read`` is the number of rows the
+    ``ingestion`` stage has produced so far.
+    """
+
+    def __init__(self, trace_memory=False, progress=None):
+        self.trace_memory = trace_memory
+        self.progress = progress
+        self.records = {}
+        self._stack = []
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        self._token = _active.set(self)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        _active.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        record = self.records.setdefault(name, {"stage": name, "calls": 0, "rows": 0, "wall_s": 0.0,
+                                                "cpu_s": 0.0, "peak_rss_mb": None, "rss_growth_mb": 0.0})
+        frame = SimpleNamespace(rows=rows, child_wall=0.0, child_cpu=0.0, peak_traced=0)
+        if self.progress is not None:
+            self.progress(name, self.records.get("ingestion", {}).get("rows", 0))
+        if self.trace_memory:
+            if self._stack:
+                # Keep the parent's peak so far before the child resets the counter
+                parent = self._stack[-1]
+                parent.peak_traced = max(parent.peak_traced, tracemalloc.get_traced_memory()[1] - parent.traced_start)
+            frame.traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_before = _peak_rss_mb()
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield frame
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            record["calls"] += 1
+            record["rows"] += frame.rows or 0
+            record["wall_s"] += wall - frame.child_wall
+            record["cpu_s"] += cpu - frame.child_cpu
+            rss_after = _peak_rss_mb()
+            if rss_after is not None:
+                record["peak_rss_mb"] = rss_after
+                record["rss_growth_mb"] = max(record["rss_growth_mb"], rss_after - rss_before)
+            if self.trace_memory:
+                frame.peak_traced = max(frame.peak_traced, tracemalloc.get_traced_memory()[1] - frame.traced_start)
+                record["traced_peak_mb"] = max(record.get("traced_peak_mb", 0.0), frame.peak_traced / 2**20)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_wall += wall
+                parent.child_cpu += cpu
+
+    def summary(self):
+        return [dict(record) for record in self.records.values()]
+
+
+def profile_stage(name, rows=0):
+    # Times a stage under the active StageProfiler; a no-op outside of one
+    profiler = _active.get()
+    if profiler is None:
+        return nullcontext(SimpleNamespace(rows=rows))
+    return profiler.stage(name, rows)
+
+
+def profile_iter(name, iterable):
+    # Charges producing each item (e.g. reading a chunk) to the named stage, but not the caller's work on it
+    iterator = iter(iterable)
+    while True:
+        with profile_stage(name) as stage:
+            item = next(iterator, None)
+            stage.rows = len(item) if item is not None else 0
+        if item is None:
+            return
+        yield item
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Positions of the first flagged rows kept per check, enough for report and app previews
+HEAD_ROWS = 5
+
+
+def _concat_rows(frames):
+    # Chunks categorize independently; giving a column the union of its categories keeps it categorical
+    dtypes = {}
+    for frame in frames:
+        for col, dtype in frame.dtypes.items():
+            dtypes.setdefault(col, []).append(dtype)
+    unified = {}
+    for col, col_dtypes in dtypes.items():
+        if len(col_dtypes) == len(frames) and all(isinstance(d, pd.CategoricalDtype) for d in col_dtypes):
+            empty = [pd.Categorical([], categories=d.categories) for d in col_dtypes]
+            unified[col] = pd.CategoricalDtype(union_categoricals(empty).categories)
+    if unified:
+        frames = [frame.astype(unified) for frame in frames]
+    return pd.concat(frames)
+
+
+class IssueMatrix:
+    """Rows x checks boolean matrix recording which checks each row failed.
+
+    Checks set bits in place; the long ``bad_rows`` frame (one row per failed
+    check, tagged with ``issue``) is only built when ``to_frame`` is called.
+    ``metadata`` holds run-level facts such as row counts and memory saved by
+    categorical conversion; counts add up and column lists union on ``concat``.
+
+    Each check's count and the positions of its first HEAD_ROWS rows are
+    recorded when it is added and carried through compact/merge/concat, so
+    ``counts`` and previews (``to_frame`` with a small ``limit``) cost
+    O(checks) rather than a scan of the matrix per check.
+    """
+
+    def __init__(self, rows, capacity=16, metadata=None):
+        self.rows = rows
+        self.metadata = dict(metadata or {})
+        self.labels = []
+        self.keys = []
+        self._positions = {}
+        self._counts = []
+        self._heads = []
+        # Column-major so every check writes one contiguous column
+        self.bits = np.zeros((len(rows), capacity), dtype=bool, order='F')
+
+    def _column(self, key, label):
+        j = self._positions.get(label)
+        if j is None:
+            j = len(self.labels)
+            if j == self.bits.shape[1]:
+                grown = np.zeros((self.bits.shape[0], 2 * max(j, 1)), dtype=bool, order='F')
+                grown[:, :j] = self.bits
+                self.bits = grown
+            self.labels.append(label)
+            self.keys.append(key)
+            self._positions[label] = j
+            self._counts.append(0)
+            self._heads.append(np.empty(0, dtype=np.intp))
+        return j
+
+    def _record(self, j):
+        # Re-derive one check's count and first rows after its bits changed
+        column = self.bits[:, j]
+        self._counts[j] = int(column.sum())
+        self._heads[j] = np.flatnonzero(column)[:HEAD_ROWS]
+
+    def add(self, key, label, mask):
+        if isinstance(mask, pd.Series):
+            # Nullable and Arrow-backed comparisons leave NA where the cell was missing
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            j = self._column(key, label)
+            self.bits[:, j] |= mask
+            self._record(j)
+
+    @property
+    def empty(self):
+        return not self.labels
+
+    def __len__(self):
+        # Number of distinct rows with at least one issue
+        return int(self.bits[:, :len(self.labels)].any(axis=1).sum())
+
+    def counts(self):
+        return dict(zip(self.labels, self._counts))
+
+    def summary(self):
+        summary = {}
+        for key, count in zip(self.keys, self.counts().values()):
+            summary[key] = summary.get(key, 0) + count
+        return summary
+
+    def mask(self, label):
+        return self.bits[:, self._positions[label]]
+
+    def select(self, suffix):
+        return [label for label in self.labels if label.endswith(suffix)]
+
+    def to_frame(self, labels=None, limit=None):
+        labels = self.labels if labels is None else [l for l in labels if l in self._positions]
+        parts = []
+        remaining = limit
+        for label in labels:
+            j = self._positions[label]
+            if remaining is not None and remaining <= HEAD_ROWS:
+                part = self.rows.iloc[self._heads[j][:remaining]]
+            else:
+                part = self.rows[self.bits[:, j]]
+            if remaining is not None:
+                part = part.head(remaining)
+                remaining -= len(part)
+            parts.append(part.assign(issue=label))
+            if remaining == 0:
+                break
+        if not parts:
+            return self.rows.head(0).assign(issue=pd.Series(dtype=object))
+        return pd.concat(parts)
+
+    def groups(self):
+        for label in self.labels:
+            yield label, self.rows[self.mask(label)]
+
+    def compact(self):
+        # Keep only rows that failed at least one check
+        n = len(self.labels)
+        keep = self.bits[:, :n].any(axis=1)
+        compacted = IssueMatrix(self.rows[keep], capacity=max(n, 1), metadata=self.metadata)
+        compacted.labels, compacted.keys = list(self.labels), list(self.keys)
+        compacted._positions = dict(self._positions)
+        compacted.bits[:, :n] = self.bits[keep, :n]
+        # Every flagged row is kept, so counts stay and first rows just move to their new positions
+        new_positions = np.cumsum(keep) - 1
+        compacted._counts = list(self._counts)
+        compacted._heads = [new_positions[head] for head in self._heads]
+        return compacted
+
+    def merge(self, other):
+        # Union by index label, for results of separate passes over the same rows
+        extra = other.rows.index.difference(self.rows.index)
+        rows = pd.concat([self.rows, other.rows.loc[extra]]).sort_index() if len(extra) else self.rows
+        # Both passes read the same rows, so run metadata comes from the first
+        merged = IssueMatrix(rows, capacity=max(len(self.labels) + len(other.labels), 1), metadata=self.metadata)
+        for m in (self, other):
+            positions = rows.index.get_indexer(m.rows.index)
+            for j, (key, label) in enumerate(zip(m.keys, m.labels)):
+                column = merged._column(key, label)
+                merged.bits[positions, column] |= m.bits[:, j]
+        # Rows may be flagged by both passes, so counts are taken from the merged (compact) bits
+        for j in range(len(merged.labels)):
+            merged._record(j)
+        return merged
+
+    @classmethod
+    def concat(cls, matrices):
+        matrices = list(matrices)
+        if not matrices:
+            return cls(pd.DataFrame())
+        # Chunks without issues add no rows, and leaving them out keeps their dtypes out of the result
+        frames = [m.rows for m in matrices if len(m.rows)] or [matrices[0].rows]
+        merged = cls(_concat_rows(frames) if len(frames) > 1 else frames[0])
+        offset = 0
+        for m in matrices:
+            for name, value in m.metadata.items():
+                if isinstance(value, list):
+                    seen = merged.metadata.setdefault(name, [])
+                    seen.extend(v for v in value if v not in seen)
+                else:
+                    merged.metadata[name] = merged.metadata.get(name, 0) + value
+            columns = [merged._column(key, label) for key, label in zip(m.keys, m.labels)]
+            merged.bits[offset:offset + len(m.rows), columns] = m.bits[:, :len(columns)]
+            for j, column in enumerate(columns):
+                merged._counts[column] += m._counts[j]
+                if len(merged._heads[column]) < HEAD_ROWS:
+                    head = np.concatenate([merged._heads[column], m._heads[j] + offset])
+                    merged._heads[column] = head[:HEAD_ROWS]
+            offset += len(m.rows)
+        return merged
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from pathlib import Path
+
+from scripts.ingest import estimate_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    state TEXT NOT NULL,
+    stage TEXT,
+    rows_read INTEGER NOT NULL DEFAULT 0,
+    total_rows INTEGER,
+    result TEXT,
+    error TEXT,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL
+)
+"""
+
+# Progress is written at most this often, however many stages and chunks go by
+PROGRESS_INTERVAL = 0.5
+
+# Finished jobs, their results and reports are deleted after this long
+DEFAULT_RETENTION = 24 * 60 * 60
+
+
+def _connect(db_path):
+    # Every process opens its own connection; WAL lets readers poll while a worker writes
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _update(db_path, job_id, **fields):
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                     [*fields.values(), job_id])
+
+
+def _run_job(db_path, job_id, file_path, job_dir, options):
+    # Runs in a pool worker: validates one file into its job directory, reporting progress and the
+    # outcome to the job table
+    from scripts.rule_based_validation import validate_dataset
+
+    _update(db_path, job_id, state="running", started=time.time())
+    last = 0.0
+
+    def progress(stage, rows_read):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL:
+            last = now
+            _update(db_path, job_id, stage=stage, rows_read=rows_read)
+
+    try:
+        result = validate_dataset(file_path, progress=progress, reports_dir=job_dir, **options)
+        result_path = Path(job_dir) / "result.pkl"
+        tmp = Path(f"{result_path}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, result_path)
+    except Exception as exc:
+        _update(db_path, job_id, state="failed", error=f"{type(exc).__name__}: {exc}",
+                finished=time.time())
+        return
+    _update(db_path, job_id, state="done", stage=None, rows_read=result[0].metadata.get("rows", 0),
+            result=str(result_path), finished=time.time())
+
+
+class JobRunner:
+    """Runs validate_dataset in the background, one process per job, tracked in SQLite.
+
+    ``submit`` queues a validation and returns its job id at once;
+    ``status`` reports the job's state, current stage and rows read so far;
+    ``result`` loads the ``(issues, report_file, issues_summary)`` of a
+    finished job. Jobs run in a process pool of ``workers`` processes, so
+    several sessions can validate at the same time without blocking each
+    other, and any process can read the job table. Each job writes its
+    report and result to its own directory under ``jobs_dir``, so jobs for
+    files with the same name never share a report.
+
+    Jobs left queued or running by a previous runner are marked failed when
+    a new one starts. Finished jobs are deleted, with their directories,
+    ``retention`` seconds after they finish. If a worker process dies (e.g.
+    out of memory), the jobs in the pool fail and the pool is replaced.
+    """
+
+    def __init__(self, jobs_dir, workers=2, retention=DEFAULT_RETENTION):
+        self.jobs_dir = Path(jobs_dir).resolve()
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.jobs_dir / "jobs.sqlite"
+        self.workers = workers
+        self.retention = retention
+        with closing(_connect(self.db_path)) as conn, conn:
+            conn.execute(SCHEMA)
+            conn.execute("UPDATE jobs SET state = 'failed', error = 'Interrupted by a restart', finished = ? "
+                         "WHERE state IN ('queued', 'running')", [time.time()])
+        self._lock = threading.Lock()
+        self.pool = self._new_pool()
+        self.cleanup()
+
+    def _new_pool(self):
+        # Spawned rather than forked: the caller (e.g. a Streamlit server) is multi-threaded
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_pool(self, broken):
+        # Done callbacks of every job in a broken pool land here; only the first replaces it
+        with self._lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False)
+                self.pool = self._new_pool()
+
+    def submit(self, file_path, **options):
+        # options are passed to validate_dataset
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        job_dir = self.jobs_dir / job_id
+        job_dir.mkdir()
+        with closing(_connect(self.db_path)) as conn, conn:
+            conn.execute("INSERT INTO jobs (id, file, state, total_rows, submitted) VALUES (?, ?, 'queued', ?, ?)",
+                         [job_id, str(file_path), estimate_rows(file_path), time.time()])
+        pool = self.pool
+        try:
+            future = pool.submit(_run_job, self.db_path, job_id, file_path, job_dir, options)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            pool = self.pool
+            future = pool.submit(_run_job, self.db_path, job_id, file_path, job_dir, options)
+        future.add_done_callback(lambda future: self._check_worker(job_id, future, pool))
+        return job_id
+
+    def _check_worker(self, job_id, future, pool):
+        # _run_job records its own errors; this catches workers that died or never started
+        exc = future.exception()
+        if exc is not None:
+            _update(self.db_path, job_id, state="failed", error=f"{type(exc).__name__}: {exc}",
+                    finished=time.time())
+        if isinstance(exc, BrokenProcessPool):
+            self._replace_pool(pool)
+
+    def cleanup(self):
+        # Deletes finished jobs older than the retention period, with their reports and results
+        with closing(_connect(self.db_path)) as conn, conn:
+            expired = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE state IN ('done', 'failed') AND finished < ?",
+                [time.time() - self.retention])]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [[job_id] for job_id in expired])
+        for job_id in expired:
+            shutil.rmtree(self.jobs_dir / job_id, ignore_errors=True)
+        return len(expired)
+
+    def status(self, job_id):
+        with closing(_connect(self.db_path)) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", [job_id]).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown job {job_id!r}")
+        return dict(row)
+
+    def result(self, job_id):
+        # Raises KeyError once the job has expired; the caller can submit it again
+        job = self.status(job_id)
+        if job["state"] != "done":
+            raise RuntimeError(f"Job {job_id} is {job['state']}" + (f": {job['error']}" if job["error"] else ""))
+        with open(job["result"], "rb") as f:
+            return pickle.load(f)
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,117 @@
+import operator
+from numbers import Real
+
+import numpy as np
+import pandas as pd
+
+
+class CompiledRules:
+    """validation_rules.json compiled once into arrays that evaluate in a single pass.
+
+    All numeric min/max bounds of numeric columns are checked with one
+    broadcast comparison over a 2-D array; other bounds (e.g. ISO date
+    strings) are compared column by column. Every ``allowed`` list is kept as a
+    unique ``pd.Index`` whose hash table is built once and reused for every
+    frame or chunk. Categorical columns are looked up once per category and
+    the result is gathered through the integer codes. Each clause yields one boolean mask, in the same order and
+    with the same ``{col}_below_min`` / ``_above_max`` / ``_invalid_value``
+    labels as the rules file.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.clauses = []
+        self.allowed = {}
+        for col, rule in rules.items():
+            if "min" in rule:
+                self.clauses.append((col, f"{col}_below_min", "min", rule["min"]))
+            if "max" in rule:
+                self.clauses.append((col, f"{col}_above_max", "max", rule["max"]))
+            if "allowed" in rule:
+                self.clauses.append((col, f"{col}_invalid_value", "allowed", None))
+                self.allowed[col] = pd.Index(rule["allowed"]).unique()
+        # Only columns whose bounds are all numbers go into the broadcast arrays
+        bounded = {col: rule for col, rule in rules.items() if "min" in rule or "max" in rule}
+        self.bound_columns = [col for col, rule in bounded.items()
+                              if all(_is_number(rule[k]) for k in ("min", "max") if k in rule)]
+        self.other_bounds = {col: rule for col, rule in bounded.items() if col not in self.bound_columns}
+        self.mins = np.array([bounded[col].get("min", np.nan) for col in self.bound_columns], dtype=float)
+        self.maxs = np.array([bounded[col].get("max", np.nan) for col in self.bound_columns], dtype=float)
+
+    @property
+    def columns(self):
+        return list(self.rules)
+
+    def __bool__(self):
+        return bool(self.clauses)
+
+    def _bound_masks(self, df):
+        present = [i for i, col in enumerate(self.bound_columns) if col in df.columns]
+        numeric = [i for i in present if pd.api.types.is_numeric_dtype(df[self.bound_columns[i]])
+                   and not pd.api.types.is_bool_dtype(df[self.bound_columns[i]])]
+        masks = {}
+        if numeric:
+            values = df[[self.bound_columns[i] for i in numeric]].to_numpy(dtype=float, na_value=np.nan)
+            # NaN bounds and NaN cells both compare False, matching the per-column filters
+            below = values < self.mins[numeric]
+            above = values > self.maxs[numeric]
+            for k, i in enumerate(numeric):
+                col = self.bound_columns[i]
+                masks[f"{col}_below_min"] = below[:, k]
+                masks[f"{col}_above_max"] = above[:, k]
+        for i in present:
+            if i in numeric:
+                continue
+            col = self.bound_columns[i]
+            if not np.isnan(self.mins[i]):
+                masks[f"{col}_below_min"] = compare(df[col], operator.lt, self.mins[i])
+            if not np.isnan(self.maxs[i]):
+                masks[f"{col}_above_max"] = compare(df[col], operator.gt, self.maxs[i])
+        for col, rule in self.other_bounds.items():
+            if col not in df.columns:
+                continue
+            if "min" in rule:
+                masks[f"{col}_below_min"] = compare(df[col], operator.lt, rule["min"])
+            if "max" in rule:
+                masks[f"{col}_above_max"] = compare(df[col], operator.gt, rule["max"])
+        return masks
+
+    def evaluate(self, df):
+        masks = self._bound_masks(df)
+        for col, label, kind, _ in self.clauses:
+            if col not in df.columns:
+                continue
+            if kind == "allowed":
+                yield label, invalid_values(self.allowed[col], df[col])
+            else:
+                yield label, masks[label]
+
+
+def _is_number(value):
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def compare(values, op, bound):
+    # op(values, bound) as a boolean mask, False for missing cells; categoricals compare each category once
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        result = np.append(np.asarray(op(values.cat.categories, bound), dtype=bool), False)
+        return result[values.cat.codes.to_numpy()]
+    if isinstance(bound, str) and getattr(values.dtype, "kind", None) == "M":
+        # Engines that parse dates (e.g. pyarrow's date32) need the ISO string as a timestamp
+        bound = pd.Timestamp(bound)
+    return op(values, bound).to_numpy(dtype=bool, na_value=False)
+
+
+def invalid_values(allowed, values):
+    # Boolean mask of values not in the allowed pd.Index
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # The trailing entry is picked by code -1 (missing), which is valid only if NaN is allowed
+        invalid = np.append(allowed.get_indexer(values.cat.categories) == -1, not allowed.hasnans)
+        return invalid[values.cat.codes.to_numpy()]
+    return allowed.get_indexer(values) == -1
+
+
+def compile_rules(rules):
+    if rules is None or isinstance(rules, CompiledRules):
+        return rules
+    return CompiledRules(rules)
@@ -0,0 +1,131 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scripts.stats import numeric_matrix
+
+EXECUTORS = ("thread", "process")
+
+
+def _numeric_masks(values, bounds):
+    negative = values < 0
+    if bounds is None:
+        return negative, None
+    low, high = bounds
+    return negative, (values < low) | (values > high)
+
+
+def _shared_column_masks(shm_name, shape, positions, bounds):
+    # Runs in a worker process: attach to the parent's block and return packed bit masks
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F')
+        results = []
+        for j, col_bounds in zip(positions, bounds):
+            negative, outlier = _numeric_masks(block[:, j], col_bounds)
+            results.append((j, np.packbits(negative), None if outlier is None else np.packbits(outlier)))
+        return results
+    finally:
+        shm.close()
+
+
+# Pools are kept for the life of the process so chunks and files reuse the same workers
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(executor, workers):
+    with _pools_lock:
+        if (executor, workers) not in _pools:
+            pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+            _pools[executor, workers] = pool_class(max_workers=workers)
+        return _pools[executor, workers]
+
+
+def _discard_pool(executor, workers, broken):
+    # A worker that died (e.g. out of memory) breaks its pool for good; the next get_pool makes a new one
+    with _pools_lock:
+        if _pools.get((executor, workers)) is broken:
+            del _pools[executor, workers]
+            broken.shutdown(wait=False)
+
+
+def _split(items, parts):
+    return [items[i::parts] for i in range(parts) if items[i::parts]]
+
+
+def numeric_column_masks(df, columns, workers=None, executor="thread", bounds=None):
+    """Negative-value and outlier masks per numeric column, computed on a worker pool.
+
+    ``bounds`` maps columns to their (low, high) outlier limits, or is a
+    function computing that dict from the float matrix of the columns and
+    their names (e.g. ``OutlierStatistics.exact_bounds``), so in-memory
+    bounds are read from the same matrix the workers scan. Outlier masks are
+    only computed for columns that have bounds.
+
+    The columns are copied once into one column-major float64 matrix. Threads
+    read it in place; processes attach to it as a shared-memory block, so no
+    DataFrame is pickled: only the column positions and bounds go out, and
+    both masks of a column come back bit-packed from the same call.
+    Returns ``{col: (negative_mask, outlier_mask or None)}``.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}; expected one of {EXECUTORS}")
+    workers = workers or os.cpu_count() or 1
+    columns = list(columns)
+    if not columns:
+        return {}
+
+    if executor == "thread":
+        X = numeric_matrix(df, columns)
+        bounds = _bounds_of(bounds, X, columns)
+        masks = get_pool("thread", workers).map(lambda j: _numeric_masks(X[:, j], bounds.get(columns[j])),
+                                                range(len(columns)))
+        return dict(zip(columns, masks))
+
+    n = len(df)
+    shape = (n, len(columns))
+    shm = shared_memory.SharedMemory(create=True, size=max(n * len(columns) * 8, 1))
+    try:
+        block = numeric_matrix(df, columns, out=np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F'))
+        bounds = _bounds_of(bounds, block, columns)
+        del block
+        for attempt in range(2):
+            pool = get_pool("process", workers)
+            try:
+                results = _process_masks(pool, shm.name, shape, columns, bounds, workers)
+                break
+            except BrokenProcessPool:
+                # Retried once on a fresh pool; a second failure (e.g. this frame is too big) is raised
+                _discard_pool("process", workers, pool)
+                if attempt:
+                    raise
+        return {col: results[col] for col in columns}
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _process_masks(pool, shm_name, shape, columns, bounds, workers):
+    n = shape[0]
+    futures = [pool.submit(_shared_column_masks, shm_name, shape, positions,
+                           [bounds.get(columns[j]) for j in positions])
+               for positions in _split(list(range(len(columns))), workers)]
+    results = {}
+    for future in futures:
+        for j, negative, outlier in future.result():
+            results[columns[j]] = (
+                np.unpackbits(negative, count=n).astype(bool),
+                None if outlier is None else np.unpackbits(outlier, count=n).astype(bool),
+            )
+    return results
+
+
+def _bounds_of(bounds, X, columns):
+    if callable(bounds):
+        return bounds(X, columns)
+    return bounds or {}
@@ -1,5 +1,10 @@
 import pandas as pd
 import os
+import sys
+from ingest import read_table
+
+# usage: python profile_data.py [pandas|pyarrow]
+engine = sys.argv[1] if len(sys.argv) > 1 else "pandas"
 
 # locate latest file in data/raw
 raw_dir = "../data/raw"
@@ -9,7 +14,11 @@ path = os.path.join(raw_dir, latest_file)
 
 print("📂 Profiling file:", path)
 
-df = pd.read_csv(path, parse_dates=["date"])
+if engine == "pyarrow":
+    # Arrow infers ISO dates itself and nulls whitespace-only cells while reading
+    df = read_table(path, engine="pyarrow")
+else:
+    df = pd.read_csv(path, parse_dates=["date"])
 
 # Basic info
 print("\n--- Dataset Shape ---")
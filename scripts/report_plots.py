@@ -0,0 +1,145 @@
+import html
+import json
+import os
+import re
+from pathlib import Path
+
+from scripts.ingest import numeric_columns
+from scripts.stats import box_statistics
+
+# inline: every chart file embeds plotly.js (~4.7 MB each), as the original plots did.
+# shared: every chart file references one plotly.min.js written next to it.
+# page:   all charts are JSON specs on a single page that loads the shared plotly.min.js.
+PLOT_MODES = ("inline", "shared", "page")
+
+# aggregate: box plots carry only quartiles, whiskers and a capped outlier sample.
+# raw:       box plots embed every value of the column and let plotly.js compute them.
+BOX_MODES = ("aggregate", "raw")
+
+PLOTLY_JS = "plotly.min.js"
+
+PAGE_TEMPLATE = """<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="{plotly_js}"></script></head>
+<body><h1>{title}</h1>
+{divs}
+<script>
+const template = {template};
+const specs = {specs};
+for (const [id, spec] of Object.entries(specs)) {{
+  spec.layout.template = template;
+  Plotly.newPlot(id, spec.data, spec.layout, {{responsive: true}});
+}}
+</script></body></html>
+"""
+
+
+def plot_filename(name):
+    # Column names may hold quotes and spaces; keep file names portable
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "plot"
+
+
+def box_figure(name, stats):
+    # A box drawn from precomputed aggregates (see stats.box_statistics), plus its outlier sample
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Box(x=[name], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                           lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+                           name=name, boxpoints=False))
+    if stats["outliers"]:
+        fig.add_trace(go.Scatter(x=[name] * len(stats["outliers"]), y=stats["outliers"], mode="markers",
+                                 name="outliers (sample)"))
+    fig.update_layout(showlegend=False, yaxis_title=name)
+    return fig
+
+
+def issue_figures(issues_summary, df=None, box_stats=None, box_mode="aggregate"):
+    """Plotly figures for a validation run, keyed by plot name.
+
+    ``issues_bar`` charts the issue counts. With the validated frame, a
+    ``missing_values`` heatmap and one ``{col}_box`` plot per numeric column
+    are added. Box plots are drawn from ``box_stats`` when given (streaming
+    runs have no frame), otherwise from ``df`` as ``box_mode`` says.
+    """
+    import plotly.express as px
+
+    if box_mode not in BOX_MODES:
+        raise ValueError(f"Unknown box mode {box_mode!r}; expected one of {BOX_MODES}")
+
+    figures = {}
+    if issues_summary:
+        figures["issues_bar"] = px.bar(x=list(issues_summary), y=list(issues_summary.values()),
+                                       labels={"x": "Issue", "y": "Count"})
+    if df is not None:
+        missing = df.isnull().sum()
+        missing = missing[missing > 0]
+        if len(missing):
+            figures["missing_values"] = px.imshow([missing.to_numpy()], x=[str(col) for col in missing.index],
+                                                  y=["Missing"], text_auto=True)
+        if box_mode == "raw":
+            for col in numeric_columns(df):
+                figures[f"{col}_box"] = px.box(df, y=col)
+        elif box_stats is None:
+            box_stats = box_statistics(df)
+    for col, stats in (box_stats or {}).items():
+        if stats is not None:
+            figures[f"{col}_box"] = box_figure(str(col), stats)
+    return figures
+
+
+def write_plotlyjs(plots_dir):
+    # Written once per directory and shared by every chart in it
+    from plotly.offline import get_plotlyjs
+
+    path = Path(plots_dir) / PLOTLY_JS
+    if not path.exists():
+        # Batch workers may race to create it; each writes its own file and renames it into place
+        tmp = path.with_name(f"{PLOTLY_JS}.{os.getpid()}.tmp")
+        tmp.write_text(get_plotlyjs(), encoding="utf-8")
+        os.replace(tmp, path)
+    return path
+
+
+def _spec(fig):
+    # Plain JSON with plotly's own encoding (typed arrays for numeric data)
+    return json.loads(fig.to_json())
+
+
+def write_plot_page(figures, page_path, title="Validation Plots"):
+    """All figures as JSON specs on one page that loads the shared plotly.min.js.
+
+    The layout template, which is the bulk of a plain plotly spec, is
+    written once and attached to every chart in the browser, so the page
+    grows with the plotted data rather than with the number of charts.
+    """
+    page_path = Path(page_path)
+    write_plotlyjs(page_path.parent)
+    specs, divs, template = {}, [], {}
+    for i, (name, fig) in enumerate(figures.items()):
+        spec = _spec(fig)
+        template = spec["layout"].pop("template", template)
+        specs[f"plot-{i}"] = {"data": spec["data"], "layout": spec["layout"]}
+        divs.append(f"<h2>{html.escape(name)}</h2><div id=\"plot-{i}\"></div>")
+    with open(page_path, "w", encoding="utf-8") as f:
+        # "<" is escaped inside the JSON so no value can close the script tag
+        f.write(PAGE_TEMPLATE.format(title=html.escape(title), plotly_js=PLOTLY_JS, divs="\n".join(divs),
+                                     template=json.dumps(template).replace("<", "\\u003c"),
+                                     specs=json.dumps(specs).replace("<", "\\u003c")))
+    return page_path
+
+
+def write_plots(figures, plots_dir, mode="shared", page_name="plots.html"):
+    # Returns the written chart files, or the single page in "page" mode
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unknown plot mode {mode!r}; expected one of {PLOT_MODES}")
+    plots_dir = Path(plots_dir)
+    plots_dir.mkdir(parents=True, exist_ok=True)
+    if mode == "page":
+        return [write_plot_page(figures, plots_dir / page_name)]
+    if mode == "shared":
+        write_plotlyjs(plots_dir)
+    paths = []
+    for name, fig in figures.items():
+        path = plots_dir / f"{plot_filename(name)}.html"
+        fig.write_html(path, include_plotlyjs="directory" if mode == "shared" else True)
+        paths.append(path)
+    return paths
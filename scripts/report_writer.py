@@ -0,0 +1,132 @@
+import html
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+from scripts.instrumentation import profile_stage
+
+MAX_DISPLAY_ROWS = 5
+
+# CSS for HTML report
+CSS_STYLE = """
+<style>
+body { font-family: 'Segoe UI', sans-serif; background-color: #f0fff4; color: #333; padding: 20px; }
+h1 { color: #2e7d32; }
+details { background-color: #e6f4ea; margin: 10px 0; padding: 10px; border-radius: 8px; }
+summary { font-weight: bold; cursor: pointer; }
+table { border-collapse: collapse; width: 100%; margin-top: 10px; }
+th, td { border: 1px solid #999; padding: 8px; text-align: left; }
+th { background-color: #a5d6a7; color: #000; }
+</style>
+"""
+
+# Report sections in order: title, the check stage that fills it, and its issue labels
+REPORT_SECTIONS = [
+    ("Missing Values", "missing", lambda issues: ['missing']),
+    ("Duplicate Rows", "duplicates", lambda issues: ['duplicate']),
+    ("Negative Values", "negative", lambda issues: issues.select('_negative')),
+    ("Outliers", "outliers", lambda issues: issues.select('_outlier')),
+    ("Invalid Categories", "categories", lambda issues: issues.select('_invalid_category')),
+    ("Rare Categories", "categories", lambda issues: issues.select('_rare_category')),
+    ("ML Anomalies", "ml", lambda issues: ['ML_anomaly']),
+    ("JSON Rule Violations", "json", lambda issues: [l for l, k in zip(issues.labels, issues.keys)
+                                                     if k == 'JSON Rule Violations']),
+]
+
+
+def _cell(value):
+    return "NaN" if pd.api.types.is_scalar(value) and pd.isna(value) else html.escape(str(value), quote=False)
+
+
+def render_table(df):
+    # Escaped HTML table of a few display rows, without DataFrame.to_html's formatting machinery
+    head = "".join(f"<th>{html.escape(str(col), quote=False)}</th>" for col in df.columns)
+    body = "".join("<tr>" + "".join(f"<td>{_cell(value)}</td>" for value in row) + "</tr>"
+                   for row in df.itertuples(index=False, name=None))
+    return f'<table class="dataframe"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def generate_html_section(title, df, issue_count=None, n_rows=None):
+    # n_rows lets callers pass only the displayed head of a larger section
+    n_rows = len(df) if n_rows is None else n_rows
+    count_info = f"<p><b>Total:</b> {issue_count}</p>" if issue_count else ""
+    if df.empty:
+        return f"<details><summary>{title}</summary>{count_info}<p>No {title} found.</p></details>"
+    more_rows_note = "<p>...and more rows not shown</p>" if n_rows > MAX_DISPLAY_ROWS else ""
+    return (f"<details><summary>{title} ({n_rows} rows)</summary>{count_info}"
+            f"{render_table(df.head(MAX_DISPLAY_ROWS))}{more_rows_note}</details>")
+
+
+def generate_not_run_section(title):
+    return f"<details><summary>{title} (not run)</summary><p>The {title} check was not run.</p></details>"
+
+
+def generate_timing_section(records):
+    if not records:
+        return ""
+    timings = pd.DataFrame(records).round(3)
+    return f"<details><summary>Stage Timings</summary>{render_table(timings)}</details>"
+
+
+def generate_plot_links(plot_files, reports_dir):
+    links = "".join(f'<li><a href="{html.escape(quote(path.relative_to(reports_dir).as_posix()))}">'
+                    f'{html.escape(path.stem)}</a></li>' for path in plot_files)
+    return f"<details><summary>Plots</summary><ul>{links}</ul></details>"
+
+
+class ReportWriter:
+    """Writes the HTML validation report to disk section by section.
+
+    ``write_stage`` writes and flushes a check's sections as soon as that
+    stage has finished, so the report can be opened while later stages are
+    still running, and only one section's display rows are rendered at a
+    time. ``finish`` writes the sections not written yet, e.g. all of them
+    for streaming runs, whose flags are final only after the last chunk;
+    sections of the stages in ``not_run`` are marked as not run rather than
+    as having found nothing.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.written = set()
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "w")
+        self.write("<html><head><title>Validation Report</title></head><body>")
+        self.write(CSS_STYLE + "<h1>Data Validation Report</h1>")
+        return self
+
+    def __exit__(self, *exc):
+        self.write("</body></html>")
+        self._file.close()
+        return False
+
+    def write(self, fragment):
+        with profile_stage("report write"):
+            self._file.write(fragment)
+            self._file.flush()
+
+    def section(self, issues, title, labels, ran=True):
+        if title in self.written:
+            return
+        self.written.add(title)
+        if not ran:
+            self.write(generate_not_run_section(title))
+            return
+        # Counts and display rows were recorded as the checks ran, so no section scans the matrix
+        with profile_stage("report write"):
+            counts = issues.counts()
+            total = sum(counts.get(label, 0) for label in labels)
+            self.write(generate_html_section(title, issues.to_frame(labels, limit=MAX_DISPLAY_ROWS), total,
+                                             n_rows=total))
+
+    def write_stage(self, issues, stage, ran=True):
+        for title, section_stage, labels in REPORT_SECTIONS:
+            if section_stage == stage:
+                self.section(issues, title, labels(issues), ran)
+
+    def finish(self, issues, not_run=()):
+        for title, stage, labels in REPORT_SECTIONS:
+            self.section(issues, title, labels(issues), ran=stage not in not_run)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResultCache:
+    """On-disk cache of validate_dataset results with size-bounded LRU eviction.
+
+    Entries are keyed by a SHA-256 of the data file bytes, the loaded rules,
+    the validator version and the options that change the result.
+    Each entry is one pickle file; its mtime is refreshed on every hit, and
+    the least recently used entries are deleted once the directory grows
+    past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, file_path, rules=None, version="", **options):
+        # rules is the loaded rules dict, however it was supplied (file, dict or compiled)
+        digest = hashlib.sha256()
+        if Path(file_path).exists():
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(b"\0" + json.dumps(rules, sort_keys=True, default=str).encode())
+        digest.update(f"\0{version}\0{sorted(options.items())!r}".encode())
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key, report_file=None):
+        # report_file is where the cached report should be written, if not where it was first written
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as f:
+                issues, cached_report, issues_summary, report_html = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        os.utime(entry)
+        # Reports are named after the file stem, so another upload may have replaced it
+        report_file = Path(report_file if report_file is not None else cached_report)
+        if not report_file.exists() or report_file.read_bytes() != report_html:
+            report_file.parent.mkdir(parents=True, exist_ok=True)
+            report_file.write_bytes(report_html)
+        return issues, report_file, issues_summary
+
+    def put(self, key, issues, report_file, issues_summary):
+        entry = self._entry(key)
+        tmp = entry.with_name(f"{key}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((issues, str(report_file), issues_summary, Path(report_file).read_bytes()), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for entry in self.cache_dir.glob("*.pkl"):
+            entry.unlink(missing_ok=True)
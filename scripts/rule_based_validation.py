@@ -1,146 +1,516 @@
+import numpy as np
 import pandas as pd
+import argparse
 import json
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from sklearn.ensemble import IsolationForest
-from sklearn.neighbors import LocalOutlierFactor
-
-MAX_DISPLAY_ROWS = 5
-
-# CSS for HTML report
-CSS_STYLE = """
-<style>
-body { font-family: 'Segoe UI', sans-serif; background-color: #f0fff4; color: #333; padding: 20px; }
-h1 { color: #2e7d32; }
-details { background-color: #e6f4ea; margin: 10px 0; padding: 10px; border-radius: 8px; }
-summary { font-weight: bold; cursor: pointer; }
-table { border-collapse: collapse; width: 100%; margin-top: 10px; }
-th, td { border: 1px solid #999; padding: 8px; text-align: left; }
-th { background-color: #a5d6a7; color: #000; }
-</style>
-"""
-
-def generate_html_section(title, df, issue_count=None):
-    count_info = f"<p><b>Total:</b> {issue_count}</p>" if issue_count else ""
-    if df.empty:
-        return f"<details><summary>{title}</summary>{count_info}<p>No {title} found.</p></details>"
-    display_df = df.head(MAX_DISPLAY_ROWS)
-    html_table = display_df.to_html(index=False, escape=False)
-    more_rows_note = "<p>...and more rows not shown</p>" if len(df) > MAX_DISPLAY_ROWS else ""
-    return f"<details><summary>{title} ({len(df)} rows)</summary>{count_info}{html_table}{more_rows_note}</details>"
+from scripts.anomaly_models import (ML_MODES, AnomalyModels, detect_anomalies, load_anomaly_models,
+                                    train_anomaly_models)
+from scripts.categories import CategoryProfile, learn_categories
+from scripts.duplicates import ApproximateDuplicateDetector, DuplicateDetector
+from scripts.ingest import (ARROW_IPC_SUFFIXES, ENGINES, PARQUET_SUFFIXES, estimate_rows, numeric_columns,
+                            project_columns, read_chunks, read_table)
+from scripts.instrumentation import StageProfiler, profile_iter, profile_stage
+from scripts.issue_matrix import IssueMatrix
+from scripts.json_rules import compile_rules
+from scripts.parallel import numeric_column_masks
+from scripts.report_plots import PLOT_MODES, issue_figures, write_plots
+from scripts.report_writer import ReportWriter, generate_plot_links, generate_timing_section
+from scripts.result_cache import ResultCache
+from scripts.stats import OutlierStatistics, numeric_matrix, outlier_flags
+
+# Bump whenever a change to the checks or report alters results, so cached results are invalidated
+VALIDATOR_VERSION = "2.11"
 
 def apply_json_rules(df, rules):
-    violations = pd.DataFrame()
-    for col, rule in rules.items():
-        if col not in df.columns:
+    issues = IssueMatrix(df)
+    check_json_rules(df, issues, rules)
+    return issues.to_frame()
+
+def load_rules(rules_path):
+    if rules_path and Path(rules_path).exists():
+        with open(rules_path, "r") as f:
+            return json.load(f)
+    return None
+
+# Each check sets its bits in the shared IssueMatrix instead of copying offending rows
+
+def check_missing(df, issues):
+    issues.add('Missing Values', 'missing', df.isnull().any(axis=1))
+
+def check_duplicates(df, issues, detector=None, streaming=False):
+    # The detector remembers fingerprints, so duplicates are found across chunks and files.
+    # An approximate detector only collects candidates here; streaming runs recheck them
+    # in a second pass over the file (see run_second_pass).
+    detector = detector if detector is not None else DuplicateDetector()
+    duplicated = detector.update(df)
+    if detector.needs_recheck and not streaming:
+        duplicated = detector.recheck(df)
+    if duplicated is not None:
+        issues.add('Duplicate Rows', 'duplicate', duplicated)
+
+def check_negative(df, issues, workers=None, executor="thread", masks=None):
+    # masks are numeric_column_masks already computed for this frame, e.g. shared with check_outliers
+    if masks is None and workers and workers > 1:
+        masks = numeric_column_masks(df, numeric_columns(df), workers, executor)
+    if masks is not None:
+        for col, (negative, _) in masks.items():
+            issues.add(f'Negative Values ({col})', f"{col}_negative", negative)
+        return
+    for col in numeric_columns(df):
+        issues.add(f'Negative Values ({col})', f"{col}_negative", df[col] < 0)
+
+def check_outliers(df, issues, bounds=None, outlier_method="sigma", workers=None, executor="thread", masks=None):
+    # bounds come from OutlierStatistics over the whole file; in-memory runs compute them here, from the
+    # same float matrix that is then flagged
+    columns = numeric_columns(df)
+    if bounds is not None:
+        columns = [col for col in columns if col in bounds]
+    if masks is None and workers and workers > 1:
+        masks = numeric_column_masks(df, columns, workers, executor,
+                                     bounds or OutlierStatistics(outlier_method).exact_bounds)
+    if masks is not None:
+        for col, (_, outlier) in masks.items():
+            if outlier is not None:
+                issues.add(f'Outliers ({col})', f"{col}_outlier", outlier)
+        return
+    X = numeric_matrix(df, columns)
+    if bounds is None:
+        bounds = OutlierStatistics(outlier_method).exact_bounds(X, columns)
+    flags = outlier_flags(X, columns, bounds)
+    for j, col in enumerate(columns):
+        issues.add(f'Outliers ({col})', f"{col}_outlier", flags[:, j])
+
+def check_invalid_categories(df, issues, categories=None):
+    # Values outside a column's allowed set, and values that were rare in the reference profile
+    if not categories:
+        return
+    for col, invalid, rare in categories.evaluate(df):
+        issues.add(f'Invalid Categories ({col})', f"{col}_invalid_category", invalid)
+        if rare is not None:
+            issues.add(f'Rare Categories ({col})', f"{col}_rare_category", rare)
+
+def ml_matrix(df):
+    # Complete numeric rows as a float matrix, plus the mask of which rows they are
+    numeric_cols = numeric_columns(df)
+    complete = df[numeric_cols].notna().all(axis=1).to_numpy()
+    return numeric_cols, complete, df.loc[complete, numeric_cols].to_numpy(dtype=float)
+
+def check_ml_anomalies(df, issues, ml_mode="full", ml_sample_size=10_000, models=None):
+    numeric_cols, complete, ml_df = ml_matrix(df)
+    if len(numeric_cols) == 0 or not complete.any():
+        return
+    if models is not None and not models.matches(numeric_cols):
+        warnings.warn(f"{model_mismatch(models, numeric_cols)}; refitting")
+        models = None
+    anomalies = np.zeros(len(df), dtype=bool)
+    if models is not None:
+        with profile_stage("ml score", len(ml_df)):
+            anomalies[np.flatnonzero(complete)] = models.predict(ml_df)
+    else:
+        with profile_stage("ml fit", len(ml_df)):
+            anomalies[np.flatnonzero(complete)] = detect_anomalies(ml_df, ml_mode, ml_sample_size)
+    issues.add('ML Anomalies', 'ML_anomaly', anomalies)
+
+def model_mismatch(models, numeric_cols):
+    import sklearn
+
+    return (f"Saved anomaly models were trained on {models.columns} with scikit-learn {models.sklearn_version}, "
+            f"not {numeric_cols} with {sklearn.__version__}")
+
+def train_models(reference_path, model_path, engine="pandas", sample_size=None):
+    # Fits the anomaly models on a reference file and saves them with its numeric schema
+    numeric_cols, _, ml_df = ml_matrix(read_table(reference_path, engine=engine))
+    return train_anomaly_models(ml_df, numeric_cols, model_path, sample_size)
+
+def check_json_rules(df, issues, rules):
+    rules = compile_rules(rules)
+    if not rules:
+        return
+    for label, mask in rules.evaluate(df):
+        issues.add('JSON Rule Violations', label, mask)
+
+def run_metadata(df):
+    # Per-frame facts from ingestion; IssueMatrix.concat adds them up across chunks
+    return {"rows": len(df),
+            "categorical_columns": list(df.attrs.get("categorical_columns", [])),
+            "category_bytes_saved": int(df.attrs.get("category_bytes_saved", 0))}
+
+# Check stages by name. Each is called as stage(df, issues, context, **options), where context
+# holds the run-wide inputs (rules, detector, models, ...) and options come from the pipeline config.
+STAGES = {}
+
+DEFAULT_PIPELINE = ("missing", "duplicates", "negative", "outliers", "categories", "ml", "json")
+
+def register_stage(name):
+    def register(func):
+        STAGES[name] = func
+        return func
+    return register
+
+@register_stage("missing")
+def missing_stage(df, issues, context):
+    check_missing(df, issues)
+
+@register_stage("duplicates")
+def duplicates_stage(df, issues, context):
+    check_duplicates(df, issues, context["detector"], context["streaming"])
+
+def shared_masks(df, context):
+    # With several workers, the negative and outliers stages share one numeric_column_masks call per frame:
+    # one float block, with both masks of a column computed in the same worker call
+    if not (context["workers"] and context["workers"] > 1):
+        return None
+    if "masks" not in context:
+        options = stage_options(context["pipeline"], "outliers")
+        bounds = None
+        if options is not None and not context["streaming"]:
+            bounds = OutlierStatistics(options.get("method") or context["outlier_method"]).exact_bounds
+        context["masks"] = numeric_column_masks(df, numeric_columns(df), context["workers"], context["executor"],
+                                                bounds)
+    return context["masks"]
+
+@register_stage("negative")
+def negative_stage(df, issues, context):
+    check_negative(df, issues, context["workers"], context["executor"], masks=shared_masks(df, context))
+
+@register_stage("outliers")
+def outliers_stage(df, issues, context, method=None):
+    if context["streaming"]:
+        # Outlier bounds need the whole column: accumulate statistics now, flag in the second pass
+        context["outlier_stats"].update(df)
+        return
+    check_outliers(df, issues, outlier_method=method or context["outlier_method"], workers=context["workers"],
+                   executor=context["executor"], masks=shared_masks(df, context))
+
+@register_stage("categories")
+def categories_stage(df, issues, context):
+    # Without a reference profile there is nothing to check against
+    if not context["categories"]:
+        issues.metadata.setdefault("skipped_stages", []).append("categories")
+        return
+    check_invalid_categories(df, issues, context["categories"])
+
+@register_stage("ml")
+def ml_stage(df, issues, context, mode=None, sample_size=None):
+    # Scoring with pre-trained models is row-local, so it also works per chunk; fitting needs the whole file,
+    # so chunks the models do not match are skipped rather than refitted one by one
+    models = context["models"]
+    if context["streaming"] and (models is None or not models.matches(numeric_columns(df))):
+        if models is not None:
+            warnings.warn(f"{model_mismatch(models, numeric_columns(df))}; skipping ML anomaly detection, "
+                          "which cannot be refitted chunk by chunk")
+        issues.metadata.setdefault("skipped_stages", []).append("ml")
+        return
+    check_ml_anomalies(df, issues, mode or context["ml_mode"], sample_size or context["ml_sample_size"],
+                       context["models"])
+
+@register_stage("json")
+def json_stage(df, issues, context):
+    check_json_rules(df, issues, context["rules"])
+
+def build_pipeline(pipeline=None):
+    """Normalize a pipeline config into a list of ``{"stage": name, ...}`` dicts.
+
+    Entries are stage names or dicts with a ``"stage"`` key, run in the order
+    given; stages left out do not run. ``"skip_if"`` lists stages whose
+    findings skip this one (``"any"`` for every earlier stage), e.g.
+    ``{"stage": "ml", "skip_if": ["json"]}``; it needs the whole file in one
+    frame, so streaming runs reject it. Other keys are passed to the
+    stage as options: ``method`` for outliers, ``mode`` and ``sample_size``
+    for ml.
+    """
+    pipeline = DEFAULT_PIPELINE if pipeline is None else pipeline
+    stages = []
+    for entry in pipeline:
+        entry = {"stage": entry} if isinstance(entry, str) else dict(entry)
+        if entry.get("stage") not in STAGES:
+            raise ValueError(f"Unknown check stage {entry.get('stage')!r}; expected one of {list(STAGES)}")
+        stages.append(entry)
+    return stages
+
+def _options(entry):
+    return {key: value for key, value in entry.items() if key not in ("stage", "skip_if")}
+
+def stage_options(pipeline, name):
+    # Options of the named stage in a built pipeline, or None when it does not run
+    return next((_options(entry) for entry in pipeline if entry["stage"] == name), None)
+
+def run_checks(df, rules=None, streaming=False, workers=None, executor="thread", ml_mode="full",
+               ml_sample_size=10_000, models=None, detector=None, outlier_stats=None, outlier_method="sigma",
+               categories=None, pipeline=None, report=None):
+    # A ReportWriter passed as report gets each stage's sections as soon as the stage has run
+    issues = IssueMatrix(df, metadata=run_metadata(df))
+    context = {"rules": rules, "streaming": streaming, "workers": workers, "executor": executor,
+               "ml_mode": ml_mode, "ml_sample_size": ml_sample_size, "models": models,
+               "detector": detector if detector is not None else DuplicateDetector(),
+               "outlier_stats": outlier_stats, "outlier_method": outlier_method, "categories": categories}
+    pipeline = build_pipeline(pipeline)
+    context["pipeline"] = pipeline
+    context["stages"] = {entry["stage"] for entry in pipeline}
+    flagged = {}
+    for entry in pipeline:
+        name, skip_if = entry["stage"], entry.get("skip_if", ())
+        if any(flagged.values()) if skip_if == "any" else any(flagged.get(s) for s in skip_if):
+            issues.metadata.setdefault("skipped_stages", []).append(name)
             continue
-        if "min" in rule:
-            invalid = df[df[col] < rule["min"]].copy()
-            if not invalid.empty:
-                invalid['issue'] = f"{col}_below_min"
-                violations = pd.concat([violations, invalid])
-        if "max" in rule:
-            invalid = df[df[col] > rule["max"]].copy()
-            if not invalid.empty:
-                invalid['issue'] = f"{col}_above_max"
-                violations = pd.concat([violations, invalid])
-        if "allowed" in rule:
-            invalid = df[~df[col].isin(rule["allowed"])].copy()
-            if not invalid.empty:
-                invalid['issue'] = f"{col}_invalid_value"
-                violations = pd.concat([violations, invalid])
-    return violations
-
-def validate_dataset(file_path, rules_path=None):
+        before = len(issues.labels)
+        with profile_stage(name, len(df)):
+            STAGES[name](df, issues, context, **_options(entry))
+        flagged[name] = len(issues.labels) > before
+        if report is not None:
+            # A stage may find it has nothing to check (e.g. no category profile) and skip itself
+            report.write_stage(issues, name, ran=name not in issues.metadata.get("skipped_stages", []))
+    return issues
+
+def run_second_pass(df, detector, bounds):
+    # Streaming checks that need statistics of the whole file, applied to one chunk;
+    # a None detector or bounds means that stage is not in the pipeline
+    issues = IssueMatrix(df)
+    if detector is not None and detector.needs_recheck:
+        with profile_stage("duplicates", len(df)):
+            issues.add('Duplicate Rows', 'duplicate', detector.recheck(df))
+    if bounds is not None:
+        with profile_stage("outliers", len(df)):
+            check_outliers(df, issues, bounds)
+    return issues.compact()
+
+def validate_dataset(file_path, rules_path=None, chunksize=None, cache=None, engine="pandas", columns=None,
+                     workers=None, executor="thread", ml_mode="full", ml_sample_size=10_000, models=None,
+                     key_columns=None, detector=None, duplicates="exact", duplicate_fpr=0.01,
+                     outlier_method="sigma", category_ratio=0.5, categories=None, rules=None, pipeline=None,
+                     trace_memory=False, plots=None, progress=None, reports_dir=None):
+    # Duplicates are matched on key_columns only when given; pass a shared DuplicateDetector
+    # to also flag rows already seen in previously validated files. duplicates="approximate"
+    # uses a Bloom filter plus an exact recheck of the candidates for files too big for
+    # an exact fingerprint set; it covers one file only. outlier_method is "sigma", "mad" or "iqr", or a
+    # {column: method} dict for per-column selection. Text columns with at most
+    # category_ratio distinct values per row are loaded as category (None keeps object);
+    # the memory this saves is reported in issues.metadata. categories is a CategoryProfile or
+    # the path of a reference file to learn allowed values from; the category check flags
+    # only values outside that profile, while the rules' allowed lists stay with the JSON
+    # rules (as {col}_invalid_value, nulls included). rules may be
+    # already loaded or compiled rules, which saves re-reading rules_path for every file;
+    # cached results are keyed on the rules' content however they are given. pipeline
+    # selects, orders and configures the check stages (see build_pipeline). trace_memory adds
+    # tracemalloc peaks to the per-stage timings, at some cost in speed. plots writes charts to
+    # reports/plots in one of report_plots.PLOT_MODES ("page" puts them all on one page).
+    # progress is called as progress(stage, rows_read) whenever a stage starts. reports_dir
+    # replaces reports/ as the home of the report and plots, e.g. one directory per job.
+    cache_key = None
+    pipeline = build_pipeline(pipeline)
+    stages = {entry["stage"] for entry in pipeline}
+    outlier_method = (stage_options(pipeline, "outliers") or {}).get("method") or outlier_method
+    if chunksize and any("skip_if" in entry for entry in pipeline):
+        # Each chunk would decide on its own findings, running the stage on some chunks and not others
+        raise ValueError("skip_if needs the whole file and cannot be combined with chunksize")
+    # models may be AnomalyModels or the path of saved ones; they replace fitting in the ML stage
+    if models is not None and not isinstance(models, AnomalyModels):
+        models = load_anomaly_models(models)
+    if categories is not None and not isinstance(categories, CategoryProfile):
+        categories = learn_categories(categories, engine=engine)
+    rules = compile_rules(rules if rules is not None else load_rules(rules_path))
     BASE_DIR = Path(__file__).resolve().parent.parent
     PROCESSED_DIR = BASE_DIR / "data" / "processed"
-    REPORTS_DIR = BASE_DIR / "reports"
+    # Resolved so report_file is absolute (callers link to it with as_uri) whatever the working directory
+    REPORTS_DIR = Path(reports_dir).resolve() if reports_dir is not None else BASE_DIR / "reports"
+    report_file = REPORTS_DIR / f"validation_summary_{Path(file_path).stem}.html"
+    # cache may be a ResultCache or a directory to keep one in. A shared detector makes the
+    # result depend on previously validated files, so it is never cached.
+    if cache is not None and detector is None:
+        if not isinstance(cache, ResultCache):
+            cache = ResultCache(cache)
+        cache_key = cache.key(file_path, rules.rules if rules else None, VALIDATOR_VERSION,
+                              chunksize=chunksize, engine=engine,
+                              columns=sorted(columns) if columns is not None else None,
+                              ml_mode=ml_mode, ml_sample_size=ml_sample_size,
+                              models=models.digest if models is not None else None,
+                              key_columns=key_columns, duplicates=duplicates, duplicate_fpr=duplicate_fpr,
+                              outlier_method=sorted(outlier_method.items()) if isinstance(outlier_method, dict)
+                              else outlier_method, category_ratio=category_ratio,
+                              categories=categories.digest if categories is not None else None,
+                              pipeline=[sorted(entry.items()) for entry in pipeline], plots=plots)
+        cached = cache.get(cache_key, report_file)
+        if cached is not None:
+            return cached
+
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
-    df = pd.read_csv(file_path, na_values=["", "NA", "N/A", "-"])
-    df = df.replace(r'^\s*$', pd.NA, regex=True)
-    bad_rows = pd.DataFrame()
-    issues_summary = {}
-
-    # --- Missing Values ---
-    missing_rows = df[df.isnull().any(axis=1)]
-    if not missing_rows.empty:
-        issues_summary['Missing Values'] = len(missing_rows)
-        bad_rows = pd.concat([bad_rows, missing_rows.assign(issue='missing')])
-
-    # --- Duplicate Rows ---
-    duplicates = df[df.duplicated()]
-    if not duplicates.empty:
-        issues_summary['Duplicate Rows'] = len(duplicates)
-        bad_rows = pd.concat([bad_rows, duplicates.assign(issue='duplicate')])
-
-    # --- Negative Values ---
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-    for col in numeric_cols:
-        neg = df[df[col] < 0]
-        if not neg.empty:
-            bad_rows = pd.concat([bad_rows, neg.assign(issue=f"{col}_negative")])
-            issues_summary[f'Negative Values ({col})'] = len(neg)
-
-    # --- Outliers ---
-    for col in numeric_cols:
-        mean, std = df[col].mean(), df[col].std()
-        outliers = df[(df[col] > mean + 3*std) | (df[col] < mean - 3*std)]
-        if not outliers.empty:
-            bad_rows = pd.concat([bad_rows, outliers.assign(issue=f"{col}_outlier")])
-            issues_summary[f'Outliers ({col})'] = len(outliers)
-
-    # --- Invalid Categories ---
-    cat_cols = df.select_dtypes(include=['object']).columns
-    for col in cat_cols:
-        invalid = df[df[col].isnull()]
-        if not invalid.empty:
-            bad_rows = pd.concat([bad_rows, invalid.assign(issue=f"{col}_invalid_category")])
-            issues_summary[f'Invalid Categories ({col})'] = len(invalid)
-
-    # --- ML Anomalies ---
-    if len(numeric_cols) > 0:
-        ml_df = df[numeric_cols].dropna()
-        if not ml_df.empty:
-            iso = IsolationForest(contamination=0.01, random_state=42)
-            iso_labels = iso.fit_predict(ml_df)
-            iso_outliers = ml_df[iso_labels == -1]
-            lof = LocalOutlierFactor(n_neighbors=20, contamination=0.01)
-            lof_labels = lof.fit_predict(ml_df)
-            lof_outliers = ml_df[lof_labels == -1]
-            ml_outliers = pd.concat([iso_outliers, lof_outliers]).drop_duplicates()
-            if not ml_outliers.empty:
-                bad_rows = pd.concat([bad_rows, ml_outliers.assign(issue='ML_anomaly')])
-                issues_summary['ML Anomalies'] = len(ml_outliers)
-
-    # --- JSON Rules ---
-    json_rows = pd.DataFrame()
-    if rules_path and Path(rules_path).exists():
-        with open(rules_path, "r") as f:
-            rules = json.load(f)
-        json_rows = apply_json_rules(df, rules)
-        if not json_rows.empty:
-            bad_rows = pd.concat([bad_rows, json_rows])
-            issues_summary['JSON Rule Violations'] = len(json_rows)
-
-    # --- Save HTML Report ---
-    html_sections = [CSS_STYLE, "<h1>Data Validation Report</h1>"]
-    html_sections.append(generate_html_section("Missing Values", missing_rows, len(missing_rows)))
-    html_sections.append(generate_html_section("Duplicate Rows", duplicates, len(duplicates)))
-    html_sections.append(generate_html_section("Negative Values", bad_rows[bad_rows['issue'].str.contains('_negative')], 
-                                               sum(bad_rows['issue'].str.contains('_negative'))))
-    html_sections.append(generate_html_section("Outliers", bad_rows[bad_rows['issue'].str.contains('_outlier')],
-                                               sum(bad_rows['issue'].str.contains('_outlier'))))
-    html_sections.append(generate_html_section("Invalid Categories", bad_rows[bad_rows['issue'].str.contains('_invalid_category')],
-                                               sum(bad_rows['issue'].str.contains('_invalid_category'))))
-    html_sections.append(generate_html_section("ML Anomalies", bad_rows[bad_rows['issue']=='ML_anomaly'],
-                                               sum(bad_rows['issue']=='ML_anomaly')))
-    html_sections.append(generate_html_section("JSON Rule Violations", json_rows, len(json_rows)))
+    # Per-stage wall/CPU time, memory and rows end up in issues.metadata["stage_timings"].
+    # The report is written as the run goes, so finished sections can be read before it ends
+    with StageProfiler(trace_memory, progress) as profiler, ReportWriter(report_file) as report:
+        # When the caller restricts the checked columns, read only those plus the ones the rules reference
+        if columns is not None:
+            columns = project_columns(file_path, list(columns) + (rules.columns if rules else []) +
+                                      list(key_columns or []))
+        elif stages <= {"json", "categories"}:
+            # Only column-local stages run, so the file is read for the columns they reference
+            wanted = (rules.columns if rules and "json" in stages else []) + \
+                (categories.columns if categories is not None and "categories" in stages else [])
+            columns = project_columns(file_path, wanted) if wanted else None
+        if "duplicates" not in stages:
+            detector = None
+        elif detector is None and duplicates == "approximate":
+            detector = ApproximateDuplicateDetector(estimate_rows(file_path), duplicate_fpr, key_columns)
+        elif detector is None:
+            detector = DuplicateDetector(key_columns)
 
-    report_file = REPORTS_DIR / f"validation_summary_{Path(file_path).stem}.html"
-    with open(report_file, "w") as f:
-        f.write("<html><head><title>Validation Report</title></head><body>")
-        f.write("".join(html_sections))
-        f.write("</body></html>")
+        # In streaming mode each chunk keeps only its failing rows, so peak memory
+        # depends on chunk size plus the offending rows rather than on file size
+        df = None
+        if chunksize:
+            # With plots, every numeric column is sketched so box plots need no frame
+            outlier_stats = OutlierStatistics(outlier_method, sketch_all=bool(plots))
+            chunks = profile_iter("ingestion", read_chunks(file_path, chunksize, engine, columns, category_ratio))
+            # Reading and checking the chunks happen inside concat but are charged to their own stages
+            with profile_stage("collect results"):
+                issues = IssueMatrix.concat(run_checks(chunk, rules, True, workers, executor, models=models,
+                                                       detector=detector, outlier_stats=outlier_stats,
+                                                       categories=categories, pipeline=pipeline).compact()
+                                            for chunk in chunks)
+            bounds = outlier_stats.bounds() if "outliers" in stages else None
+            if bounds is not None or (detector is not None and detector.needs_recheck):
+                chunks = profile_iter("ingestion", read_chunks(file_path, chunksize, engine, columns, category_ratio))
+                with profile_stage("collect results"):
+                    issues = issues.merge(IssueMatrix.concat(run_second_pass(chunk, detector, bounds)
+                                                             for chunk in chunks))
+        else:
+            df = next(profile_iter("ingestion", read_chunks(file_path, engine=engine, columns=columns,
+                                                            category_ratio=category_ratio)))
+            issues = run_checks(df, rules, workers=workers, executor=executor, ml_mode=ml_mode,
+                                ml_sample_size=ml_sample_size, models=models, detector=detector,
+                                outlier_method=outlier_method, categories=categories, pipeline=pipeline,
+                                report=report)
+        with profile_stage("collect results"):
+            issues = issues.compact()
+            issues_summary = issues.summary()
+
+        # --- Save HTML Report ---
+        # Streaming runs still need their sections; stages that never ran are marked as such
+        report.finish(issues, not_run=(set(STAGES) - stages) | set(issues.metadata.get("skipped_stages", [])))
+        if plots:
+            # Box plots carry only aggregates; streaming runs take them from the outlier sketches
+            with profile_stage("plots"):
+                box_stats = None
+                if df is None:
+                    box_stats = {col: sketch.box_statistics() for col, sketch in outlier_stats.sketches.items()}
+                plot_files = write_plots(issue_figures(issues_summary, df, box_stats), REPORTS_DIR / "plots",
+                                         plots, page_name=f"{Path(file_path).stem}_plots.html")
+            report.write(generate_plot_links(plot_files, REPORTS_DIR))
+        # The timings section is written last, so it covers everything but writing itself
+        report.write(generate_timing_section(profiler.summary()))
+    issues.metadata["stage_timings"] = profiler.summary()
+
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, issues, report_file, issues_summary)
+    return issues, report_file, issues_summary
+
+SUPPORTED_SUFFIXES = {".csv"} | PARQUET_SUFFIXES | ARROW_IPC_SUFFIXES
+
+# Rules, models and category profile shared by every file a batch worker validates
+_batch_state = {}
+
+def _init_batch_worker(rules_path, models, categories):
+    _batch_state.update(rules=compile_rules(load_rules(rules_path)), models=models, categories=categories)
+
+def _validate_file(file_path, rules_path, options):
+    # Runs in a batch worker; only the summary travels back, not the issue rows
+    start = time.perf_counter()
+    try:
+        issues, report_file, summary = validate_dataset(file_path, rules_path, rules=_batch_state["rules"],
+                                                        models=_batch_state["models"],
+                                                        categories=_batch_state["categories"], **options)
+    except Exception as exc:
+        return {"file": str(file_path), "error": f"{type(exc).__name__}: {exc}",
+                "seconds": time.perf_counter() - start}
+    return {"file": str(file_path), "rows": issues.metadata.get("rows"), "rows_with_issues": len(issues),
+            "summary": summary, "report": str(report_file), "seconds": time.perf_counter() - start}
+
+def expand_paths(paths):
+    # Directories contribute the data files directly inside them, in name order
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in SUPPORTED_SUFFIXES))
+        else:
+            files.append(path)
+    return files
+
+def batch_validate(paths, rules_path=None, models=None, categories=None, workers=1, summary_path=None,
+                   engine="pandas", **options):
+    """Validate many files in one process tree and write a consolidated summary CSV.
+
+    Rules, saved anomaly models and the category profile are loaded once and
+    handed to each worker when it starts, so no file pays for them again.
+    With ``workers > 1`` files are validated in parallel on a process pool.
+    A file that fails to validate is recorded with its error instead of
+    stopping the batch. Returns the per-file results and the summary path.
+    """
+    files = expand_paths(paths)
+    if models is not None and not isinstance(models, AnomalyModels):
+        models = load_anomaly_models(models)
+    if categories is not None and not isinstance(categories, CategoryProfile):
+        categories = learn_categories(categories, engine=engine)
+    options = dict(options, engine=engine)
+    if workers and workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files)), initializer=_init_batch_worker,
+                                 initargs=(rules_path, models, categories)) as pool:
+            results = list(pool.map(_validate_file, files, repeat(rules_path), repeat(options)))
+    else:
+        _init_batch_worker(rules_path, models, categories)
+        results = [_validate_file(path, rules_path, options) for path in files]
+
+    # One row per file and failed check; files without issues (or that errored) get a single row
+    records = []
+    for result in results:
+        base = {key: result.get(key) for key in ("file", "rows", "rows_with_issues", "seconds", "report", "error")}
+        for check, count in (result.get("summary") or {None: None}).items():
+            records.append({**base, "check": check, "count": count})
+    if summary_path is None:
+        summary_path = Path(__file__).resolve().parent.parent / "reports" / "batch_summary.csv"
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary = pd.DataFrame(records, columns=["file", "rows", "rows_with_issues", "check", "count", "seconds",
+                                             "report", "error"])
+    summary = summary.astype({"rows": "Int64", "rows_with_issues": "Int64", "count": "Int64"}).round({"seconds": 3})
+    summary.to_csv(summary_path, index=False)
+    return results, summary_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scripts.rule_based_validation",
+                                     description="Validate data files and write a consolidated summary.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    validate = commands.add_parser("validate", help="validate files or directories of files")
+    validate.add_argument("paths", nargs="+", help="CSV/Parquet/Feather files, or directories containing them")
+    validate.add_argument("--rules", help="validation_rules.json to apply to every file")
+    validate.add_argument("--models", help="saved anomaly models to score every file with")
+    validate.add_argument("--categories", help="reference file to learn allowed category values from")
+    validate.add_argument("--workers", type=int, default=1, help="files validated in parallel")
+    validate.add_argument("--engine", default="pandas", choices=ENGINES)
+    validate.add_argument("--chunksize", type=int, help="stream each file in chunks of this many rows")
+    validate.add_argument("--ml-mode", default="full", choices=ML_MODES)
+    validate.add_argument("--cache", help="directory of cached results to reuse")
+    validate.add_argument("--plots", choices=PLOT_MODES, help="also write charts to reports/plots")
+    validate.add_argument("--stages", nargs="+", choices=list(STAGES), help="check stages to run, in order")
+    validate.add_argument("--summary", help="summary CSV path (default reports/batch_summary.csv)")
+    args = parser.parse_args(argv)
+
+    results, summary_path = batch_validate(args.paths, args.rules, args.models, args.categories, args.workers,
+                                           args.summary, engine=args.engine, chunksize=args.chunksize,
+                                           ml_mode=args.ml_mode, cache=args.cache, pipeline=args.stages,
+                                           plots=args.plots)
+    for result in results:
+        if result.get("error"):
+            print(f"FAILED  {result['file']}: {result['error']}")
+        else:
+            print(f"{result['rows_with_issues']:>8} rows with issues  {result['seconds']:6.2f}s  {result['file']}")
+    print(f"Summary written to {summary_path}")
+    return 1 if any(result.get("error") for result in results) else 0
 
-    return bad_rows, report_file, issues_summary
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from scripts.ingest import numeric_columns
+
+
+def numeric_matrix(df, columns, out=None):
+    # Column-major float matrix of the given columns; columns missing from this frame are all NaN.
+    # Each column is one contiguous block, so it is filled with a single copy and reduced in place.
+    # out, e.g. an array over shared memory, is filled instead of a new matrix.
+    X = np.empty((len(df), len(columns)), order="F") if out is None else out
+    for j, col in enumerate(columns):
+        if col not in df.columns:
+            X[:, j] = np.nan
+            continue
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            # A column numeric in earlier chunks may be read as text in this one: its non-numbers are NaN
+            values = pd.to_numeric(values, errors="coerce")
+        X[:, j] = values.to_numpy(dtype=float, na_value=np.nan)
+    return X
+
+
+class StreamingMoments:
+    """Count, mean and sum of squared deviations for every numeric column, merged chunk by chunk.
+
+    Each chunk's moments are computed for all columns in one vectorized pass
+    and combined with the running totals using the pairwise update of Chan
+    et al., which is numerically stable for any number of chunks and gives
+    the same mean/std (ddof=1, NaN skipped) as pandas on the whole column.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+
+    def update(self, df):
+        columns = self.columns + [col for col in numeric_columns(df) if col not in self.columns]
+        return self.update_matrix(numeric_matrix(df, columns), columns)
+
+    def update_matrix(self, X, columns):
+        # X is numeric_matrix(df, columns), where columns starts with the columns seen so far
+        new = columns[len(self.columns):]
+        if new:
+            self.columns += new
+            self.count, self.mean, self.m2 = (np.concatenate([a, np.zeros(len(new))])
+                                              for a in (self.count, self.mean, self.m2))
+        n_b = (~np.isnan(X)).sum(axis=0).astype(float)
+        seen = n_b > 0
+        mean_b = np.zeros(len(self.columns))
+        mean_b[seen] = np.nansum(X[:, seen], axis=0) / n_b[seen]
+        m2_b = np.nansum((X - mean_b) ** 2, axis=0)
+
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(n > 0, self.mean + delta * n_b / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + m2_b + delta ** 2 * n_a * n_b / n, 0.0)
+        self.count = n
+        return self
+
+    def merge(self, other):
+        for col, count, mean, m2 in zip(other.columns, other.count, other.mean, other.m2):
+            if col not in self.columns:
+                self.columns.append(col)
+                self.count, self.mean, self.m2 = (np.append(a, 0.0) for a in (self.count, self.mean, self.m2))
+            j = self.columns.index(col)
+            n = self.count[j] + count
+            if n:
+                delta = mean - self.mean[j]
+                self.m2[j] += m2 + delta ** 2 * self.count[j] * count / n
+                self.mean[j] += delta * count / n
+            self.count[j] = n
+        return self
+
+    def std(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    def bounds(self, k=3):
+        # {col: (low, high)}; columns without a std get NaN bounds, which flag nothing
+        mean, std = np.where(self.count > 0, self.mean, np.nan), self.std()
+        return {col: (mean[j] - k*std[j], mean[j] + k*std[j]) for j, col in enumerate(self.columns)}
+
+
+def outlier_flags(X, columns, bounds):
+    # One broadcast comparison of numeric_matrix(df, columns) against the bounds; rows x columns flags
+    low = np.array([bounds[col][0] for col in columns], dtype=float)
+    high = np.array([bounds[col][1] for col in columns], dtype=float)
+    return (X < low) | (X > high)
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch with bounded memory.
+
+    Items live in levels where an item at level h stands for 2**h values.
+    When a level outgrows its capacity (``k`` at the top, shrinking by 2/3
+    per level below) it is sorted and every other item, from a random
+    offset, is promoted to the next level. Memory stays around ``3k`` items
+    and quantile estimates have a rank error of roughly ``1.7 / k`` (under
+    1% at the default ``k=200``), regardless of how many values are added.
+    Inputs with at most ``k`` values are answered exactly.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        while True:
+            over = [h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            # An odd item out stays behind so the promoted half is exactly half
+            leftover, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[h] = leftover
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        if len(values):
+            self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._compress()
+        return self
+
+    def weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    @staticmethod
+    def _weighted_quantiles(items, weights, qs):
+        if not len(items):
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(weights)
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks), len(items) - 1)]
+
+    def quantiles(self, qs):
+        return self._weighted_quantiles(*self.weighted_items(), qs)
+
+    def median_abs_deviation(self):
+        # MAD estimated from the same weighted items, so it needs no second pass over the data
+        items, weights = self.weighted_items()
+        median = self._weighted_quantiles(items, weights, [0.5])[0]
+        deviations = np.abs(items - median)
+        order = np.argsort(deviations, kind='stable')
+        return median, self._weighted_quantiles(deviations[order], weights[order], [0.5])[0]
+
+    def box_statistics(self, max_outliers=100, seed=0):
+        # Approximate box aggregates; the outlier sample comes from the retained items plus the exact extremes
+        if not self.count:
+            return None
+        items, weights = self.weighted_items()
+        q1, median, q3 = self._weighted_quantiles(items, weights, [0.25, 0.5, 0.75])
+        items = np.concatenate([items, [self.min, self.max]])
+        return _box_from_quartiles(items, q1, median, q3, self.count, max_outliers, seed)
+
+
+def _box_from_quartiles(values, q1, median, q3, count, max_outliers, seed):
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+    outliers = np.unique(values[(values < low) | (values > high)])
+    if len(outliers) > max_outliers:
+        # Keep the extremes and a random spread of the rest
+        rng = np.random.default_rng(seed)
+        middle = rng.choice(outliers[1:-1], max_outliers - 2, replace=False)
+        outliers = np.sort(np.concatenate([outliers[[0, -1]], middle]))
+    return {"count": int(count), "q1": float(q1), "median": float(median), "q3": float(q3),
+            "lowerfence": float(inside.min()) if len(inside) else float(q1),
+            "upperfence": float(inside.max()) if len(inside) else float(q3),
+            "outliers": outliers.tolist()}
+
+
+def box_statistics(df, columns=None, max_outliers=100, seed=0):
+    """Box-plot aggregates for numeric columns: quartiles, Tukey whiskers and a capped outlier sample.
+
+    Quartiles of all columns come from one vectorized percentile call over
+    the column matrix. Whiskers are the most extreme values within 1.5 IQR
+    of the quartiles; at most ``max_outliers`` values beyond them are kept,
+    always including the minimum and maximum. The result is the same size
+    whether a column has a thousand values or a hundred million.
+    """
+    columns = numeric_columns(df) if columns is None else list(columns)
+    X = numeric_matrix(df, columns)
+    with warnings.catch_warnings():
+        # All-NaN columns give NaN quartiles and are dropped below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        q1, median, q3 = np.nanpercentile(X, [25, 50, 75], axis=0)
+    stats = {}
+    for j, col in enumerate(columns):
+        if np.isnan(median[j]):
+            continue
+        values = X[:, j]
+        values = values[~np.isnan(values)]
+        stats[col] = _box_from_quartiles(values, q1[j], median[j], q3[j], len(values), max_outliers, seed)
+    return stats
+
+
+OUTLIER_METHODS = ("sigma", "mad", "iqr")
+
+
+class OutlierStatistics:
+    """Streaming statistics behind every outlier method, for one file or many.
+
+    ``method`` is one of OUTLIER_METHODS for all columns, or a
+    ``{column: method}`` dict where unlisted columns use ``"sigma"``:
+
+    - ``sigma``: mean +/- 3 std, from StreamingMoments.
+    - ``mad``: median +/- 3.5 * MAD / 0.6745 (modified z-score), from a QuantileSketch.
+    - ``iqr``: [Q1 - 1.5 IQR, Q3 + 1.5 IQR], from a QuantileSketch.
+
+    Columns whose spread (std, MAD or IQR) is zero or undefined get NaN bounds and flag nothing.
+    The sketches are for columns that arrive in chunks or from several files;
+    ``exact_bounds`` gives the exact bounds of a frame held in memory.
+    With ``sketch_all=True`` every numeric column also gets a sketch, e.g. for box plots.
+    """
+
+    def __init__(self, method="sigma", k=200, sketch_all=False):
+        methods = method.values() if isinstance(method, dict) else [method]
+        unknown = set(methods) - set(OUTLIER_METHODS)
+        if unknown:
+            raise ValueError(f"Unknown outlier method(s) {sorted(unknown)}; expected {OUTLIER_METHODS}")
+        self.method = method
+        self.k = k
+        self.sketch_all = sketch_all
+        self.moments = StreamingMoments()
+        self.sketches = {}
+
+    def method_for(self, col):
+        if isinstance(self.method, dict):
+            return self.method.get(col, "sigma")
+        return self.method
+
+    def update(self, df):
+        self.moments.update(df)
+        for col in numeric_columns(df):
+            if self.sketch_all or self.method_for(col) != "sigma":
+                values = df[col].to_numpy(dtype=float, na_value=np.nan)
+                self.sketches.setdefault(col, QuantileSketch(self.k)).update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        for col, sketch in other.sketches.items():
+            if col in self.sketches:
+                self.sketches[col].merge(sketch)
+            else:
+                self.sketches[col] = sketch
+        return self
+
+    def bounds(self):
+        bounds = self.moments.bounds()
+        for col, sketch in self.sketches.items():
+            if self.method_for(col) == "mad":
+                bounds[col] = _mad_bounds(*sketch.median_abs_deviation())
+            elif self.method_for(col) == "iqr":
+                bounds[col] = _iqr_bounds(*sketch.quantiles([0.25, 0.75]))
+        return bounds
+
+    def exact_bounds(self, X, columns):
+        # Bounds of a frame held in memory, from its numeric_matrix(df, columns): exact medians and
+        # quartiles, as in box_statistics, not sketches
+        bounds = StreamingMoments().update_matrix(X, list(columns)).bounds()
+        mad_positions = [j for j, col in enumerate(columns) if self.method_for(col) == "mad"]
+        iqr_positions = [j for j, col in enumerate(columns) if self.method_for(col) == "iqr"]
+        with warnings.catch_warnings():
+            # All-NaN columns give NaN bounds, which flag nothing
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if mad_positions:
+                M = X[:, mad_positions]
+                median = np.nanmedian(M, axis=0)
+                mad = np.nanmedian(np.abs(M - median), axis=0)
+                bounds.update({columns[j]: _mad_bounds(median[i], mad[i]) for i, j in enumerate(mad_positions)})
+            if iqr_positions:
+                q1, q3 = np.nanpercentile(X[:, iqr_positions], [25, 75], axis=0)
+                bounds.update({columns[j]: _iqr_bounds(q1[i], q3[i]) for i, j in enumerate(iqr_positions)})
+        return bounds
+
+
+def _mad_bounds(median, mad):
+    spread = 3.5 * mad / 0.6745 if mad > 0 else np.nan
+    return (median - spread, median + spread)
+
+
+def _iqr_bounds(q1, q3):
+    spread = 1.5 * (q3 - q1) if q3 > q1 else np.nan
+    return (q1 - spread, q3 + spread)